@@ -0,0 +1,222 @@
+import asyncio
+import functools
+import logging
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from yavdr_frontend.config import (
+    BackgroundBackendEnum,
+    BackgroundConfig,
+    BackgroundType,
+)
+from yavdr_frontend.tools import feh_set_background
+
+# max. size of the image data sent with a single PutImage request
+X11_MAX_REQUEST_BYTES = 256 * 1024
+
+
+class BackgroundRequest(NamedTuple):
+    background_type: BackgroundType
+    display: str
+    config: BackgroundConfig
+    env: Mapping[str, str]
+
+    @property
+    def key(self) -> tuple[BackgroundType, str]:
+        return self.background_type, self.display
+
+
+@functools.lru_cache(maxsize=8)
+def render_background(path: Path, fill: bool, width: int, height: int) -> bytes:
+    """
+    decode the image and scale (fill) or center it like feh does,
+    returns the image as 32 bit BGRX data for the root window
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        if fill:
+            image = ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+        else:
+            canvas = Image.new("RGB", (width, height))
+            canvas.paste(image, ((width - image.width) // 2, (height - image.height) // 2))
+            image = canvas
+        return image.tobytes("raw", "BGRX")
+
+
+class X11RootPixmapBackend:
+    """
+    Draw the background directly to the root window of the X server.
+
+    The decoded images are cached and the connections to the X servers are kept
+    open, so the pixmaps of the backgrounds stay valid.
+    """
+
+    def __init__(self, log: logging.Logger):
+        # raises an ImportError if python-xlib or pillow are missing
+        import PIL  # noqa: F401
+        import Xlib.display  # noqa: F401
+
+        self.log = log
+        self.displays: dict[str, Any] = {}
+        self.pixmaps: dict[str, Any] = {}
+        # display name -> the task drawing its background in a worker thread
+        self.drawing: dict[str, asyncio.Task[None]] = {}
+
+    def _get_display(self, display_name: str) -> Any:
+        import Xlib.display
+
+        if (display := self.displays.get(display_name)) is None:
+            display = self.displays[display_name] = Xlib.display.Display(display_name)
+        return display
+
+    def _close_display(self, display_name: str) -> None:
+        self.pixmaps.pop(display_name, None)
+        if (display := self.displays.pop(display_name, None)) is not None:
+            try:
+                display.close()
+            except Exception:
+                pass
+
+    def _set_background(self, display_name: str, path: Path, fill: bool) -> None:
+        from Xlib import X, Xatom
+
+        display = self._get_display(display_name)
+        screen = display.screen()
+        root = screen.root
+        width, height = screen.width_in_pixels, screen.height_in_pixels
+        data = render_background(path, fill, width, height)
+
+        pixmap = root.create_pixmap(width, height, screen.root_depth)
+        gc = pixmap.create_gc()
+        rows = max(1, X11_MAX_REQUEST_BYTES // (width * 4))
+        for y in range(0, height, rows):
+            n = min(rows, height - y)
+            pixmap.put_image(
+                gc,
+                0,
+                y,
+                width,
+                n,
+                X.ZPixmap,
+                screen.root_depth,
+                0,
+                data[y * width * 4 : (y + n) * width * 4],
+            )
+        gc.free()
+
+        root.change_attributes(background_pixmap=pixmap)
+        for atom_name in ("_XROOTPMAP_ID", "ESETROOT_PMAP_ID"):
+            root.change_property(
+                display.intern_atom(atom_name), Xatom.PIXMAP, 32, [pixmap.id]
+            )
+        root.clear_area(0, 0, width, height)
+        display.sync()
+        if (old_pixmap := self.pixmaps.get(display_name)) is not None:
+            old_pixmap.free()
+        self.pixmaps[display_name] = pixmap
+
+    def _draw(self, display_name: str, path: Path, fill: bool) -> None:
+        """run _set_background in the worker thread"""
+        try:
+            self._set_background(display_name, path, fill)
+        except Exception:
+            # the X server might have been restarted, reconnect next time
+            self._close_display(display_name)
+            raise
+
+    def _drawn(self, display_name: str, task: asyncio.Task[None]) -> None:
+        # the drawing timed out, the connection is closed after the thread finished
+        if not task.cancelled() and task.exception() is None:
+            self._close_display(display_name)
+
+    async def set_background(self, request: BackgroundRequest, timeout: float) -> bool:
+        display_name = request.display
+        if (running := self.drawing.get(display_name)) and not running.done():
+            # Xlib isn't thread-safe, a display is only used by one thread at a time
+            self.log.error(f"the background of {display_name} is still being drawn")
+            return False
+        task = self.drawing[display_name] = asyncio.create_task(
+            asyncio.to_thread(
+                self._draw, display_name, request.config.path, request.config.fill
+            )
+        )
+        try:
+            async with asyncio.timeout(timeout):
+                # the thread can't be stopped, so it isn't cancelled on a timeout
+                await asyncio.shield(task)
+        except TimeoutError:
+            self.log.error(f"drawing background {request.config.path} timed out")
+            task.add_done_callback(functools.partial(self._drawn, display_name))
+            return False
+        except Exception as e:
+            self.log.error(f"could not draw background {request.config.path}: {e}")
+            return False
+        return True
+
+
+class BackgroundSetter:
+    """
+    Set the background image without blocking the event loop.
+
+    Requests within the debounce time are merged, only the latest one is drawn.
+    A request is skipped if the same background type is already shown on the
+    display; call invalidate() if the background might have been lost (e.g. after
+    a restart of the X server).
+    """
+
+    def __init__(
+        self,
+        backend: BackgroundBackendEnum,
+        timeout: float,
+        debounce: float,
+        log: logging.Logger,
+    ):
+        self.timeout = timeout
+        self.debounce = debounce
+        self.log = log
+        self.x11_backend: X11RootPixmapBackend | None = None
+        if backend is BackgroundBackendEnum.X11:
+            try:
+                self.x11_backend = X11RootPixmapBackend(log)
+            except ImportError as e:
+                log.warning(f"x11 background backend not available, using feh: {e}")
+        self.shown: tuple[BackgroundType, str] | None = None
+        self.requested: BackgroundRequest | None = None
+        self.task: asyncio.Task[None] | None = None
+
+    def invalidate(self) -> None:
+        self.shown = None
+
+    def set_background(self, request: BackgroundRequest) -> None:
+        self.requested = request
+        if self.task is None or self.task.done():
+            if request.key == self.shown:
+                self.log.debug("background %s is already shown", request.key)
+                return
+            self.task = asyncio.create_task(self._apply())
+
+    async def wait(self) -> None:
+        """wait until the pending background has been set"""
+        if self.task is not None:
+            await asyncio.shield(self.task)
+
+    async def _apply(self) -> None:
+        await asyncio.sleep(self.debounce)
+        while (request := self.requested) is not None:
+            self.requested = None
+            if request.key == self.shown:
+                continue
+            self.log.debug(
+                f"set background {request.background_type} on {request.display}: "
+                f"path: {request.config.path}, fill: {request.config.fill}"
+            )
+            if self.x11_backend is not None:
+                success = await self.x11_backend.set_background(request, self.timeout)
+            else:
+                success = await feh_set_background(
+                    request.config.path, request.config.fill, request.env, self.timeout
+                )
+            self.shown = request.key if success else None
@@ -9,6 +9,8 @@ from pydantic import (
     Field,
     NonNegativeFloat,
     NonNegativeInt,
+    PositiveFloat,
+    PositiveInt,
     StringConstraints,
     field_validator,
 )
@@ -35,6 +37,33 @@ class ShutdownEnum(enum.StrEnum):
     VDR = "vdr"
 
 
+class BackgroundBackendEnum(enum.StrEnum):
+    FEH = "feh"
+    X11 = "x11"  # needs python-xlib and pillow
+
+
+class SuspendModeEnum(enum.StrEnum):
+    STOP = "stop"
+    FREEZE = "freeze"  # freeze the processes of the unit, thaw them on the next start
+
+
+class LaunchModeEnum(enum.StrEnum):
+    TEMPLATE = "template"  # start the app@.service instance for the .desktop file
+    TRANSIENT = "transient"  # run the Exec line of the .desktop file as transient unit
+
+
+class ResourceRoleEnum(enum.StrEnum):
+    ACTIVE = "active"  # the current frontend
+    STANDBY = "standby"  # the frontend to switch to
+    BACKGROUND = "background"  # other running unit frontends
+
+
+class ResourceProfile(BaseModel):
+    # see CPUWeight= and IOWeight= in systemd.resource-control(5)
+    cpu_weight: int = Field(default=100, ge=1, le=10000)
+    io_weight: int = Field(default=100, ge=1, le=10000)
+
+
 class MainConfig(BaseModel):
     primary_frontend: str = Field(default="dummy")
     secondary_frontend: str = Field(default="dummy")
@@ -46,6 +75,39 @@ class MainConfig(BaseModel):
         default="%(filename)s:%(lineno)s:%(name)s.%(funcName)s(): %(message)s"
     )
     shutdown_manager: ShutdownEnum = Field(default=ShutdownEnum.VDR)
+    background_backend: BackgroundBackendEnum = Field(default=BackgroundBackendEnum.FEH)
+    # max. time (in seconds) to wait for feh
+    background_timeout: PositiveFloat = Field(default=5.0)
+    # only the last background requested within this time (in seconds) is set
+    background_debounce: NonNegativeFloat = Field(default=0.1)
+    # max. number of frontends which are set up at the same time during the startup
+    frontend_init_concurrency: PositiveInt = Field(default=4)
+    # use a BasicFrontend if a frontend isn't ready after this time (in seconds)
+    frontend_init_timeout: PositiveFloat = Field(default=15.0)
+    # how .desktop files which aren't configured as applications are started
+    app_launch_mode: LaunchModeEnum = Field(default=LaunchModeEnum.TEMPLATE)
+    # create the frontends of the applications on their first use
+    lazy_frontends: bool = Field(default=True)
+    # release unit frontends which haven't been used for this time (in seconds), 0 keeps them
+    frontend_idle_release: NonNegativeFloat = Field(default=0.0)
+    # stop frozen frontends if less memory (in MiB) is available
+    frozen_min_available_memory: NonNegativeInt = Field(default=512)
+    # stop frozen frontends if the memory pressure (PSI "some avg10" in %) is higher
+    frozen_max_memory_pressure: PositiveFloat = Field(default=10.0)
+    # interval (in seconds) for checking the memory while frontends are frozen
+    frozen_check_interval: PositiveFloat = Field(default=10.0)
+    # CPU and IO weights of the running unit frontends depending on their role
+    resource_profiles: dict[ResourceRoleEnum, ResourceProfile] = Field(
+        default_factory=dict
+    )
+    # a frontend which exits crash_max_exits times within crash_window seconds isn't
+    # restarted anymore, the primary frontend is started instead
+    crash_window: PositiveFloat = Field(default=300.0)
+    crash_max_exits: PositiveInt = Field(default=5)
+    # delay (in seconds) before a frontend is restarted after its second exit within
+    # the window, it doubles with every further exit up to crash_max_backoff
+    crash_backoff: NonNegativeFloat = Field(default=2.0)
+    crash_max_backoff: NonNegativeFloat = Field(default=60.0)
 
     @field_validator("log_level", mode="before")
     @classmethod
@@ -86,6 +148,11 @@ class DesktopAppFrontendConfig(BaseModel):
     app_name: str
     use_pwsuspend: bool = Field(default=False)
     bus: DBusEnum = Field(default=DBusEnum.SessionBus)
+    suspend_mode: SuspendModeEnum = Field(default=SuspendModeEnum.STOP)
+    launch_mode: LaunchModeEnum = Field(default=LaunchModeEnum.TEMPLATE)
+    # max. time (in seconds) to wait for the start and stop jobs of the unit
+    start_timeout: PositiveFloat = Field(default=120.0)
+    stop_timeout: PositiveFloat = Field(default=120.0)
 
     def __hash__(self) -> NonNegativeInt:
         return hash(
@@ -93,6 +160,10 @@ class DesktopAppFrontendConfig(BaseModel):
                 "DesktopAppFrontendConfig",
                 self.app_name,
                 self.use_pwsuspend,
+                self.suspend_mode,
+                self.launch_mode,
+                self.start_timeout,
+                self.stop_timeout,
             )
         )
 
@@ -101,6 +172,10 @@ class UnitFrontendConfig(BaseModel):
     unit_name: str
     use_pwsuspend: bool = Field(default=False)
     bus: DBusEnum = Field(default=DBusEnum.SessionBus)
+    suspend_mode: SuspendModeEnum = Field(default=SuspendModeEnum.STOP)
+    # max. time (in seconds) to wait for the start and stop jobs of the unit
+    start_timeout: PositiveFloat = Field(default=120.0)
+    stop_timeout: PositiveFloat = Field(default=120.0)
 
     def __hash__(self) -> NonNegativeInt:
         return hash(
@@ -108,6 +183,9 @@ class UnitFrontendConfig(BaseModel):
                 "UnitFrontendConfig",
                 self.unit_name,
                 self.use_pwsuspend,
+                self.suspend_mode,
+                self.start_timeout,
+                self.stop_timeout,
             )
         )
 
@@ -156,9 +234,18 @@ class VDRConfig(BaseModel):
     frontends: dict[str, FrontendConfig]
 
 
+class KeyPolicyEnum(enum.StrEnum):
+    # ignore the key if another action is running, a key press for the running
+    # action is merged with it
+    DROP_IF_BUSY = "drop-if-busy"
+    COALESCE_LATEST = "coalesce-latest"  # replace a pending call of the same action
+    QUEUE = "queue"  # run every key press in order
+
+
 class KeymapConfig(BaseModel):
     action: str  # TODO: make this an enum for the methods in yavdr_frontend
     args: list[str] = Field(default_factory=list)
+    policy: KeyPolicyEnum = Field(default=KeyPolicyEnum.DROP_IF_BUSY)
 
 
 NonEmptyStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
@@ -190,10 +277,25 @@ class DRMConfig(BaseModel):
     )
 
 
+class KeyRepeatConfig(BaseModel):
+    # the key has to be held this long (in seconds) before repeats are accepted
+    initial_delay: NonNegativeFloat = Field(default=0.5)
+    # accepted repeats per second, 0 ignores repeated key events
+    rate: NonNegativeFloat = Field(default=0.0)
+    # increase of the rate (repeats per second) for every second the key is held
+    acceleration: NonNegativeFloat = Field(default=0.0)
+    max_rate: PositiveFloat = Field(default=20.0)
+    # ignore new presses of the key within this window (in seconds) after its last
+    # event, defaults to LircConfig.min_delay
+    debounce: NonNegativeFloat | None = None
+
+
 class LircConfig(BaseModel):
     socket: Path  # NOTE: to avoid cupling, this must not be a SocketPath type
     keymap: dict[str, KeymapConfig]
     min_delay: NonNegativeFloat = Field(default=0.3)
+    repeat: dict[str, KeyRepeatConfig] = Field(default_factory=dict)
+    queue_size: PositiveInt = Field(default=8)  # max. number of pending key actions
     log_level: LoggingEnum = Field(default=LoggingEnum.INFO)
     ignore_KEY_COFFE: bool = Field(default=False)
 
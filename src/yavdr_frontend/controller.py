@@ -1,11 +1,11 @@
 from abc import abstractmethod
 import asyncio
 from collections import deque
-from collections.abc import Coroutine
+from collections.abc import Callable, Coroutine, Mapping
 import enum
 from functools import partial
-import inspect
 import os
+import time
 from typing import Any, Protocol, Self
 
 from yavdr_frontend.config import (
@@ -13,35 +13,47 @@ from yavdr_frontend.config import (
     BackgroundType,
     Config,
     FrontendConfig,
+    KeymapConfig,
     LoggingEnum,
     NamedFrontend,
+    ResourceRoleEnum,
     ShutdownEnum,
     UnitFrontendConfig,
+    load_yaml,
 )
 
+from yavdr_frontend.background import BackgroundRequest, BackgroundSetter
 from yavdr_frontend.basicfrontend import BasicFrontend, FrontendState
+from yavdr_frontend.crash_tracker import CrashRecorder
 
 from yavdr_frontend.protocols.frontend_protocols import (
     FrontendProtocol,
     StartupStateEnum,
 )
-from yavdr_frontend.frontend_manager import system_frontend_factory
+from yavdr_frontend.frontend_manager import FrontendDescriptor, system_frontend_factory
 from yavdr_frontend.interfaces.systemd_dbus_interface import (
     create_systemd_manager_proxy,
 )
-from yavdr_frontend.lirc import handle_lirc_connection
+from yavdr_frontend.keymap import KeyActionQueue, KeyBinding, compile_keymap
+from yavdr_frontend.latency import LatencyRecorder
+from yavdr_frontend.lirc import LircConnection
 from yavdr_frontend.loghandler import create_log_handler
 
 from yavdr_frontend.interfaces.yavdr_frontend_interface import (
     yaVDRFrontendInterface,
     YAVDR_FRONTEND_BUS_NAME,
 )
+from yavdr_frontend.resource_policy import ResourcePolicy
+from yavdr_frontend.systemd_environment import SystemdEnvironment
 from yavdr_frontend.systemdfrontend import SystemdUnitFrontend
+from yavdr_frontend.transitions import TransitionEngine, TransitionEvent
+from yavdr_frontend.unit_files import get_unit_file_catalogue
 from yavdr_frontend.tools import (
     DISPLAY_RE,
-    feh_set_background,
     get_2nd_screen,
+    get_available_memory,
     get_bus,
+    get_memory_pressure,
     DelayedRepeatableTask,
 )
 from yavdr_frontend.shutdown_handler import ShutdownHandlerProtocol, VDRShutdownHandler
@@ -83,26 +95,57 @@ class Controller(NeedsControllerProtocol):
     # )  # frontends can register custom shutdown methods
 
     shutdown_task: None | DelayedRepeatableTask = None
+    delay_task: None | asyncio.Task[None] = None
 
     def __init__(self, config: "Config"):
         self.log = create_log_handler("Controller", LoggingEnum.DEBUG)
         self.config = config
-        self.keymap = config.lirc.keymap
+        self.load_keymap(config.lirc.keymap)
         # self.current_frontend = None
         self.status_lock = asyncio.Lock()
         self.state: FrontendState = FrontendState.STOP
+        # start, stop and switch the frontends one transition at a time
+        self.transitions = TransitionEngine(lambda: self.state, self.log)
+        self.background_tasks: set[asyncio.Task[Any]] = set()
+        # placeholder BasicFrontend -> the frontend which got ready after the timeout
+        self.late_frontends: dict[FrontendProtocol, FrontendProtocol] = {}
 
         self.systemd_manager = create_systemd_manager_proxy(
             bus=get_bus(self.config.main.systemd_bus)
         )
+        self.systemd_environment = SystemdEnvironment(self.systemd_manager, self.log)
+        self.background = BackgroundSetter(
+            backend=self.config.main.background_backend,
+            timeout=self.config.main.background_timeout,
+            debounce=self.config.main.background_debounce,
+            log=self.log,
+        )
+        self.resource_policy = ResourcePolicy(
+            self.config.main.resource_profiles, self.frontend_roles
+        )
+        self.transitions.listeners.append(lambda _: self.resource_policy.schedule())
+        self.crashes = CrashRecorder(
+            window=self.config.main.crash_window,
+            max_exits=self.config.main.crash_max_exits,
+            backoff=self.config.main.crash_backoff,
+            max_backoff=self.config.main.crash_max_backoff,
+        )
 
-        self.preconfigured_frontends: dict[str, FrontendProtocol] = {
-            "dummy": BasicFrontend(self),  # fallback if no frontends are defined
+        self.dummy_frontend = BasicFrontend(self)  # fallback if no frontends are defined
+        self.preconfigured_frontends: dict[str, FrontendDescriptor] = {
+            "dummy": FrontendDescriptor("dummy", None, self.dummy_frontend),
         }
 
-        self.lirc_connection = asyncio.create_task(
-            handle_lirc_connection(self.on_keypress, config=self.config)
+        self.key_latency = LatencyRecorder()
+        self.key_queue = KeyActionQueue(
+            self.on_keypress,
+            get_binding=lambda key_name: self.key_bindings.get(key_name),
+            maxsize=self.config.lirc.queue_size,
+            log=self.log,
         )
+        self.key_queue_task = asyncio.create_task(self.key_queue.run())
+        self.lirc = LircConnection(self.key_queue.submit, config=self.config.lirc)
+        self.lirc_connection = asyncio.create_task(self.lirc.run())
         self.shutdown_queue: asyncio.Queue[Coroutine[Any, Any, None]] = asyncio.Queue(
             maxsize=1
         )
@@ -119,35 +162,73 @@ class Controller(NeedsControllerProtocol):
         self.interface: yaVDRFrontendInterface = yaVDRFrontendInterface(self)
         self.interface_bus = get_bus(self.config.main.interface_bus)
 
-        for app_name, data in self.config.applications.items():
-            try:
-                self.preconfigured_frontends[app_name] = await self.get_frontend(data)
-            except ValueError as e:
-                self.log.warning(e)
-                self.preconfigured_frontends[app_name] = BasicFrontend(self)
+        # resolve all frontends concurrently, the interface is exported as soon as
+        # the primary frontend is ready
+        semaphore = asyncio.Semaphore(self.config.main.frontend_init_concurrency)
+        placeholder = self.dummy_frontend
+
+        # the BasicFrontends returned after a timeout are replaced by the real ones
+        def primary_ready(frontend: FrontendProtocol) -> None:
+            self.replace_placeholder(primary_task.result(), frontend)
+
+        def secondary_ready(frontend: FrontendProtocol) -> None:
+            self.replace_placeholder(secondary_task.result(), frontend)
+
+        async with asyncio.TaskGroup() as tg:
+            environment_task = tg.create_task(self.load_systemd_environment())
+            primary_task = tg.create_task(
+                self.resolve_frontend(
+                    NamedFrontend(name=self.config.main.primary_frontend),
+                    semaphore,
+                    primary_ready,
+                )
+            )
+            secondary_task = tg.create_task(
+                self.resolve_frontend(
+                    NamedFrontend(name=self.config.main.secondary_frontend),
+                    semaphore,
+                    secondary_ready,
+                )
+            )
+            for app_name, data in self.config.applications.items():
+                if self.config.main.lazy_frontends:
+                    self.preconfigured_frontends[app_name] = FrontendDescriptor(
+                        app_name, data
+                    )
+                else:
+                    tg.create_task(
+                        self.resolve_preconfigured_frontend(app_name, data, semaphore)
+                    )
 
-        primary_frontend = await self.get_frontend(
-            NamedFrontend(name=self.config.main.primary_frontend), controller=self
-        )
-        secondary_frontend = await self.get_frontend(
-            NamedFrontend(name=self.config.main.secondary_frontend), controller=self
-        )
+            # the fallback for frontends which keep crashing
+            self.primary_frontend: FrontendProtocol = self.late_frontends.get(
+                primary := await primary_task, primary
+            )
+            self.frontends: deque[FrontendProtocol] = deque(
+                (self.primary_frontend, placeholder),
+                maxlen=2,
+            )
+            # the interface methods read the environment, so it must be loaded first
+            await environment_task
+            await self.interface_bus.request_name_async(YAVDR_FRONTEND_BUS_NAME, 0)
+            self.__interface_handler = self.interface.export_to_dbus(
+                "/Controller", bus=self.interface_bus
+            )
 
-        self.frontends: deque[FrontendProtocol] = deque(
-            (primary_frontend, secondary_frontend),
-            maxlen=2,
-        )
+        if self.frontends[1] is placeholder:
+            secondary = secondary_task.result()
+            self.frontends[1] = self.late_frontends.get(secondary, secondary)
 
-        await self.interface_bus.request_name_async(YAVDR_FRONTEND_BUS_NAME, 0)
-        self.__interface_handler = self.interface.export_to_dbus(
-            "/Controller", bus=self.interface_bus
-        )
-        await self.systemd_manager.subscribe()
         self.display: str | None = os.environ.get(
-            "DISPLAY", (await self.get_systemd_env()).get("DISPLAY")
+            "DISPLAY", self.systemd_environment.get("DISPLAY")
         )
         self.hasX = bool(self.display)
         self.poweroff_task = asyncio.create_task(self.process_shutdown_requests())
+        if self.config.main.frontend_idle_release:
+            self.release_task = asyncio.create_task(
+                self.release_idle_frontends(self.config.main.frontend_idle_release)
+            )
+        self.evict_task = asyncio.create_task(self.evict_frozen_frontends())
         await self.start()
 
         return self
@@ -157,6 +238,10 @@ class Controller(NeedsControllerProtocol):
             self.__async_init__().__await__()
         )  # see https://stackoverflow.com/a/58976768
 
+    async def load_systemd_environment(self) -> None:
+        await self.systemd_manager.subscribe()
+        await self.systemd_environment
+
     @property
     def current_frontend(self) -> FrontendProtocol | None:
         try:
@@ -179,37 +264,250 @@ class Controller(NeedsControllerProtocol):
             self.log.exception(e, exc_info=True)
             raise
 
-    async def on_keypress(self, key_name: str):
-        self.log.info(f"on_keypress: try to call {key_name=}")
-        self.log.debug(f"{self.keymap.get(key_name)=}")
+    async def resolve_frontend(
+        self,
+        frontend_config: FrontendConfig,
+        semaphore: asyncio.Semaphore,
+        on_ready: Callable[[FrontendProtocol], None] | None = None,
+    ) -> FrontendProtocol:
+        """
+        get a frontend during the startup, a BasicFrontend is returned if it fails
+        or doesn't get ready within the configured timeout. In the latter case
+        on_ready is called with the frontend once it is ready.
+        """
+        timeout = self.config.main.frontend_init_timeout
+        async with semaphore:
+            try:
+                async with asyncio.timeout(timeout):
+                    return await self.get_frontend(frontend_config)
+            except TimeoutError:
+                self.log.warning(
+                    f"{frontend_config} is not ready after {timeout} s, using a BasicFrontend"
+                )
+                if on_ready is not None:
+                    task = asyncio.create_task(
+                        self.wait_for_frontend(frontend_config, on_ready)
+                    )
+                    self.background_tasks.add(task)
+                    task.add_done_callback(self.background_tasks.discard)
+            except ValueError as e:
+                self.log.warning(e)
+            except Exception as e:
+                self.log.exception(e)
+        return BasicFrontend(self)
+
+    def replace_placeholder(
+        self, placeholder: FrontendProtocol, frontend: FrontendProtocol
+    ) -> None:
+        """use a frontend which got ready late instead of its placeholder"""
+        self.log.info(f"frontend {frontend.name} is ready now")
+        # the placeholder might not have been assigned yet
+        self.late_frontends[placeholder] = frontend
+        if getattr(self, "primary_frontend", None) is placeholder:
+            self.primary_frontend = frontend
+        frontends = getattr(self, "frontends", ())
+        for i, current in enumerate(frontends):
+            if current is placeholder:
+                frontends[i] = frontend
+                if i == 0 and self.state is FrontendState.SWITCH:
+                    # the placeholder has been "started", start the real frontend
+                    task = asyncio.create_task(self.start())
+                    self.background_tasks.add(task)
+                    task.add_done_callback(self.background_tasks.discard)
+
+    async def wait_for_frontend(
+        self,
+        frontend_config: FrontendConfig,
+        on_ready: Callable[[FrontendProtocol], None],
+    ) -> None:
+        # the creation continues in the background, this picks up its result
+        try:
+            on_ready(await self.get_frontend(frontend_config))
+        except Exception as e:
+            self.log.warning(f"{frontend_config} failed: {e}")
+
+    async def resolve_preconfigured_frontend(
+        self, app_name: str, data: FrontendConfig, semaphore: asyncio.Semaphore
+    ) -> None:
+        def on_ready(frontend: FrontendProtocol) -> None:
+            if descriptor.frontend is fallback:
+                self.log.info(f"frontend {app_name} is ready now")
+                descriptor.frontend = frontend
+
+        descriptor = self.preconfigured_frontends[app_name] = FrontendDescriptor(
+            app_name, data
+        )
+        descriptor.frontend = fallback = await self.resolve_frontend(
+            data, semaphore, on_ready
+        )
+
+    async def materialize_frontend(self, name: str) -> FrontendProtocol | None:
+        """
+        return the frontend for name, it is created on first use.
+        Returns None if there is no matching frontend.
+        """
+        descriptor = self.preconfigured_frontends.get(name)
+        if descriptor is None:
+            descriptor = FrontendDescriptor(name, NamedFrontend(name=name))
+        try:
+            frontend = await descriptor.materialize(self)
+        except ValueError as e:
+            self.log.warning(e)
+            return None
+        self.preconfigured_frontends.setdefault(name, descriptor)
+        return frontend
+
+    def peek_frontend(self, name: str) -> FrontendProtocol | None:
+        """return the frontend for name if it has been created already"""
+        if descriptor := self.preconfigured_frontends.get(name):
+            return descriptor.peek()
+        return None
+
+    async def release_idle_frontends(self, idle_time: float) -> None:
+        while True:
+            await asyncio.sleep(max(idle_time / 2, 1.0))
+            for descriptor in self.preconfigured_frontends.values():
+                if descriptor.frontend is None:
+                    continue
+                if descriptor.frontend in self.frontends:
+                    descriptor.touch()
+                elif descriptor.is_releasable(
+                    idle_time, self.frontend_references(descriptor)
+                ):
+                    self.log.debug(f"releasing idle frontend {descriptor.name}")
+                    descriptor.release()
+
+    def frontend_references(
+        self, descriptor: FrontendDescriptor
+    ) -> list[FrontendProtocol]:
+        """return the frontends the controller holds apart from descriptor"""
+        references: list[FrontendProtocol] = [*self.frontends, self.primary_frontend]
+        references.extend(self.late_frontends.keys())
+        references.extend(self.late_frontends.values())
+        references.extend(
+            frontend
+            for other in self.preconfigured_frontends.values()
+            if other is not descriptor and (frontend := other.frontend) is not None
+        )
+        return references
+
+    def unit_frontends(self) -> list[SystemdUnitFrontend]:
+        """return the unit frontends which have been created"""
+        candidates = {id(frontend): frontend for frontend in self.frontends}
+        for descriptor in self.preconfigured_frontends.values():
+            if (frontend := descriptor.peek()) is not None:
+                candidates[id(frontend)] = frontend
+        return [
+            frontend
+            for frontend in candidates.values()
+            if isinstance(frontend, SystemdUnitFrontend)
+        ]
+
+    @staticmethod
+    def is_frozen(frontend: FrontendProtocol) -> bool:
+        return getattr(frontend, "frozen_since", None) is not None
+
+    def frozen_frontends(self) -> list[SystemdUnitFrontend]:
+        """return the frozen frontends in the background, the longest frozen first"""
+        frozen = [
+            frontend
+            for frontend in self.unit_frontends()
+            if frontend.frozen_since is not None
+            and frontend is not self.current_frontend
+        ]
+        return sorted(frozen, key=lambda frontend: frontend.frozen_since or 0.0)
+
+    def frontend_roles(self) -> list[tuple[SystemdUnitFrontend, ResourceRoleEnum]]:
+        roles: list[tuple[SystemdUnitFrontend, ResourceRoleEnum]] = []
+        for frontend in self.unit_frontends():
+            if frontend is self.current_frontend:
+                role = ResourceRoleEnum.ACTIVE
+            elif len(self.frontends) > 1 and frontend is self.frontends[1]:
+                role = ResourceRoleEnum.STANDBY
+            else:
+                role = ResourceRoleEnum.BACKGROUND
+            roles.append((frontend, role))
+        return roles
+
+    def memory_is_low(self) -> bool:
+        available = get_available_memory()
+        pressure = get_memory_pressure()
+        return (
+            available is not None
+            and available < self.config.main.frozen_min_available_memory
+        ) or (
+            pressure is not None
+            and pressure > self.config.main.frozen_max_memory_pressure
+        )
+
+    async def evict_frozen_frontends(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.main.frozen_check_interval)
+            if self.frozen_frontends() and self.memory_is_low():
+                await self.transitions.submit(
+                    TransitionEvent.EVICT, self._evict_frozen_frontend
+                )
+
+    async def _evict_frozen_frontend(self) -> tuple[bool, str]:
+        # NOTE: only one frontend is stopped per check, the memory pressure is an
+        #       average over 10 seconds and doesn't drop immediately
+        if not (frozen := self.frozen_frontends()) or not self.memory_is_low():
+            return True, "nothing to evict"
+        frontend = frozen[0]
+        self.log.info(f"memory is low, stopping the frozen frontend {frontend.name}")
+        await frontend.evict()
+        return True, f"stopped {frontend.name}"
+
+    def load_keymap(self, keymap: dict[str, KeymapConfig]) -> None:
+        """
+        compile the keymap into a dispatch table, this needs to be called again
+        if the keymap configuration changes
+        """
+        self.keymap = keymap
+        self.key_bindings: dict[str, KeyBinding] = compile_keymap(
+            self, keymap, self.log
+        )
+
+    async def reload_keymap(self) -> bool:
+        """
+        read the configuration file again and apply its keymap,
+        all other settings need a restart
+        """
+        try:
+            config = await asyncio.to_thread(load_yaml)
+        except IOError:
+            self.log.error("could not reload the keymap, no valid config file")
+            return False
+        self.config.lirc.keymap = config.lirc.keymap
+        self.load_keymap(config.lirc.keymap)
+        self.log.info(f"reloaded the keymap with {len(self.key_bindings)} bindings")
+        return True
+
+    async def on_keypress(self, key_name: str, received_ns: int | None = None):
+        """
+        run the action for key_name, received_ns is the monotonic timestamp
+        of the key event used to track the latency of the actions
+        """
+        self.log.info("on_keypress: try to call key_name=%s", key_name)
         self.last_key = key_name
 
         if self.config.lirc.ignore_KEY_COFFE and key_name == "KEY_COFFEE":
             return
-        if keymap_entry := self.keymap.get(key_name):
-            self.log.debug(f"execute key action for {key_name}: {keymap_entry=}")
+        if binding := self.key_bindings.get(key_name):
+            self.log.debug("execute key action for %s: %s", key_name, binding.action)
             try:
-                func = getattr(self, keymap_entry.action)
-                if callable(func):
-                    if inspect.iscoroutinefunction(func):
-                        self.log.debug(
-                            f"await '{func.__name__}' with {keymap_entry.args=}"
-                        )
-                        await func(keymap_entry.args)
-                    else:
-                        self.log.debug(
-                            f"call '{func.__name__} with {keymap_entry.args=}"
-                        )
-                        func(keymap_entry.args)
-                else:
-                    raise ValueError(
-                        f"on_keypress: {keymap_entry.action} is not callable"
-                    )
+                await binding.call()
             except Exception as err:
                 self.log.exception(err)
+            if received_ns is not None:
+                self.key_latency.record(
+                    binding.action, time.monotonic_ns() - received_ns
+                )
         elif self.expect_user_activity:
             self.log.debug("we have user activity: attach frontend!")
             await self.start()
+            if received_ns is not None:
+                self.key_latency.record("start", time.monotonic_ns() - received_ns)
         else:
             # stop shutdown attempt on keypress
             if self.shutdown_task and self.shutdown_task.is_running():
@@ -220,29 +518,19 @@ class Controller(NeedsControllerProtocol):
         this method returns the existing unit names.
         Don't remove or self.controller.get_frontend called with two arguments won't work!
         """
-        result = [
-            os.path.basename(unit[0])
-            for unit in await self.systemd_manager.list_unit_files()
-        ]
-        # self.log.debug(f"get_systemd_unit_names(): {result}")
-        return result
+        return await get_unit_file_catalogue(self.config.main.systemd_bus).names()
 
-    async def get_systemd_env(self) -> dict[str, str]:
+    async def get_systemd_env(self) -> Mapping[str, str]:
         """
-        return the current systemd_env as a dictionary
+        return a read-only snapshot of the cached systemd environment
         """
-        return {
-            (t := tuple(item.split("=", maxsplit=1)))[0]: t[1]
-            # workaround to avoid a tuple[str, ...] type, we need a tuple[str, str]
-            for item in await self.systemd_manager.environment
-        }
+        return self.systemd_environment.snapshot()
 
     async def set_systemd_env(self, env: dict[str, str]):
         """
         update systemd environment variables with key-value pairs from a dict.
         """
-        env_list = ["{}={}".format(key, value) for key, value in env.items()]
-        await self.systemd_manager.set_environment(env_list)
+        await self.systemd_environment.update(env)
 
     async def set_background(self, background_type: BackgroundType):
         if (
@@ -252,25 +540,28 @@ class Controller(NeedsControllerProtocol):
         ):
             background_type = BackgroundType.PREPARE_SHUTDOWN
         config: BackgroundConfig | None = self.config.backgrounds.get(background_type)
-        env = os.environ
-        env.update(await self.get_systemd_env())
+        env = {**os.environ, **self.systemd_environment.snapshot()}
         display = env.get("DISPLAY")
         if display and config:
-            self.log.debug(
-                f"set_background with options path: {config.path}, fill: {config.fill}"
+            # NOTE: this doesn't wait for the background to be drawn
+            self.background.set_background(
+                BackgroundRequest(background_type, display, config, env)
             )
-            feh_set_background(config.path, config.fill, env)
 
     async def is_active(self) -> bool:
         return await self.frontends[0].frontend_is_running()
 
     async def start(self) -> tuple[bool, str]:
+        result = await self.transitions.submit(TransitionEvent.START, self._start)
+        return result.success, result.message
+
+    async def _start(self) -> tuple[bool, str]:
         # we need to check if we have a system unit that does not use the Xorg server, otherwise
         # looking for a connected monitor is pointless
         is_xorg_client = self.current_frontend and self.current_frontend.is_xorg_client
-        if is_xorg_client and not check_configured_display(
-            os.environ.get("DISPLAY", ":0")
-        ):
+        # NOTE: the DISPLAY of the systemd manager wins, like in set_background
+        display = self.systemd_environment.get("DISPLAY", os.environ.get("DISPLAY"))
+        if is_xorg_client and not check_configured_display(display or ":0"):
             self.log.info("no configured display found, don't start yet")
             return False, ("no configured display found")
         self.expect_user_activity = False
@@ -283,6 +574,13 @@ class Controller(NeedsControllerProtocol):
         try:
             self.log.debug(f"calling start() for {current_frontend.name=}")
             await current_frontend.start()
+            if (
+                isinstance(current_frontend, SystemdUnitFrontend)
+                and current_frontend.unit.start_result not in ("", "done")
+            ):
+                self.crashes.get(current_frontend.name).record(
+                    f"start-{current_frontend.unit.start_result}"
+                )
         except Exception as e:
             self.log.exception(e)
             return False, repr(e)
@@ -295,6 +593,12 @@ class Controller(NeedsControllerProtocol):
         """stop the current frontend. if extern is true, the frontend can be
         started again by user activity. For internal calls that don't need to alter the state,
         use extern=False"""
+        result = await self.transitions.submit(
+            TransitionEvent.STOP, partial(self._stop, extern), argument=str(extern)
+        )
+        return result.success, result.message
+
+    async def _stop(self, extern: bool = True) -> tuple[bool, str]:
         self.log.debug(f"called stop(extern={extern})")
 
         self.log.debug(f"{self.current_frontend=}")
@@ -313,6 +617,11 @@ class Controller(NeedsControllerProtocol):
                     self.log.exception(e)
                     result = (False, repr(e))
                 self.log.debug("stop() got result %s", result)
+                if self.is_frozen(current_frontend):
+                    # a frozen unit sends no stop signal
+                    self.interface.frontend_changed.emit(
+                        (current_frontend.name, "stopped")
+                    )
 
         if extern:
             match self.state:
@@ -342,20 +651,102 @@ class Controller(NeedsControllerProtocol):
         )
         self.interface.frontend_changed.emit((caller.name, "stopped"))
         # self.FrontendChanged(caller.name, "stopped") # TODO: remove
+        await self.transitions.submit(
+            TransitionEvent.STOPPED,
+            partial(self._on_stopped, caller),
+            argument=caller.name,
+        )
+
+    async def _on_stopped(self, caller: FrontendProtocol) -> tuple[bool, str]:
+        if (
+            current := self.transitions.current
+        ) and current.event is TransitionEvent.STOPPED:
+            # NOTE: the stop signal of a unit may arrive after the transition which
+            # stopped it, a transition in between might have switched or restarted it
+            if (
+                self.current_frontend is None
+                or caller.name != self.current_frontend.name
+                or await caller.frontend_is_running()
+            ):
+                return True, "stale stop signal, ignoring"
+            if getattr(caller, "is_active", False) and self.state in (
+                FrontendState.SWITCH,
+                FrontendState.RESTART,
+            ):
+                # the frontend wasn't stopped by us
+                return await self.on_unexpected_exit(caller)
+        return await self.continue_after_stop()
+
+    async def continue_after_stop(self) -> tuple[bool, str]:
         match self.state:
             case FrontendState.SWITCH:
                 await self.switch_on_stopped()
             case FrontendState.RESTART:
-                await self.start()
+                await self._start()
             case FrontendState.STOP:
-                return
+                pass
             case FrontendState.PREPARE_SHUTDOWN | FrontendState.QUIT:
-                await self.stop()
+                await self._stop()
+        return True, "OK"
+
+    async def on_unexpected_exit(self, caller: FrontendProtocol) -> tuple[bool, str]:
+        result = getattr(getattr(caller, "unit", None), "exit_result", "") or "exited"
+        if result == "success":  # e.g. the user quit the application
+            return await self.continue_after_stop()
+        tracker = self.crashes.get(caller.name)
+        tracker.record(result)
+        self.log.warning(
+            f"{caller.name} exited unexpectedly ({result}), "
+            f"{tracker.recent()} times within {tracker.window}s"
+        )
+        if tracker.exceeded():
+            if caller is self.primary_frontend:
+                self.log.error(f"{caller.name} keeps crashing, giving up")
+                await self._stop()
+                return False, f"{caller.name} keeps crashing"
+            self.log.error(
+                f"{caller.name} keeps crashing, "
+                f"starting {self.primary_frontend.name} instead"
+            )
+            self.frontends[0], self.frontends[1] = self.primary_frontend, caller
+            await self._start()
+            return True, "fallback to the primary frontend"
+        if (delay := tracker.delay()) > 0:
+            self.log.info(f"delaying the next start by {delay:.1f}s")
+            task = asyncio.create_task(
+                self.continue_after_backoff(caller, self.state, delay)
+            )
+            self.background_tasks.add(task)
+            task.add_done_callback(self.background_tasks.discard)
+            return True, f"delayed by {delay:.1f}s"
+        return await self.continue_after_stop()
+
+    async def continue_after_backoff(
+        self, caller: FrontendProtocol, state: FrontendState, delay: float
+    ) -> None:
+        await asyncio.sleep(delay)
+        await self.transitions.submit(
+            TransitionEvent.STOPPED,
+            partial(self._continue_after_backoff, caller, state),
+            argument=caller.name,
+        )
+
+    async def _continue_after_backoff(
+        self, caller: FrontendProtocol, state: FrontendState
+    ) -> tuple[bool, str]:
+        # a transition during the delay may have started another frontend
+        if (
+            self.state is not state
+            or self.current_frontend is not caller
+            or await caller.frontend_is_running()
+        ):
+            return True, "state changed during the backoff, ignoring"
+        return await self.continue_after_stop()
 
     async def switch_on_stopped(self):
         self.frontends.reverse()
         self.log.debug(f"{self.frontends=}")
-        await self.start()
+        await self._start()
 
     async def set_frontend_state(self, state: FrontendState):
         async with self.status_lock:
@@ -363,13 +754,19 @@ class Controller(NeedsControllerProtocol):
             self.state = state
 
     async def toggle(self, extern: bool = True) -> tuple[bool, str]:
+        result = await self.transitions.submit(
+            TransitionEvent.TOGGLE, partial(self._toggle, extern), argument=str(extern)
+        )
+        return result.success, result.message
+
+    async def _toggle(self, extern: bool = True) -> tuple[bool, str]:
         self.log.debug("toggle frontend")
         try:
             if await self.is_active():
                 await self.set_frontend_state(FrontendState.STOP)
-                await self.stop(extern=extern)
+                await self._stop(extern=extern)
             else:
-                await self.start()
+                await self._start()
         except Exception as e:
             return False, repr(e)
         else:
@@ -380,16 +777,29 @@ class Controller(NeedsControllerProtocol):
     ) -> tuple[bool, str]:
         return await self.toggle(extern=False)
 
-    async def switch(self):
+    async def switch(self) -> tuple[bool, str]:
         """
         stop the current frontend and set a flag to perform a switch to
         the next frontend
         """
+        result = await self.transitions.submit(TransitionEvent.SWITCH, self._switch)
+        return result.success, result.message
+
+    async def _switch(self) -> tuple[bool, str]:
         self.log.debug("called switch()")
         await self.set_frontend_state(FrontendState.SWITCH)
         result = (True, "OK")
         try:
-            await self.stop(extern=False)
+            current_frontend = self.current_frontend
+            was_frozen = current_frontend and self.is_frozen(current_frontend)
+            await self._stop(extern=False)
+            if (
+                current_frontend
+                and not was_frozen
+                and self.is_frozen(current_frontend)
+            ):
+                # there is no stop signal to continue the switch
+                await self.switch_on_stopped()
         except Exception as e:
             self.log.exception(e)
             result = (False, repr(e))
@@ -397,25 +807,26 @@ class Controller(NeedsControllerProtocol):
         return result
 
     async def switchto(self, next_frontend: str) -> bool:
-        if next_frontend not in self.preconfigured_frontends:
-            if not (
-                next_frontend_candidate := await self.get_frontend(
-                    NamedFrontend(name=next_frontend)
-                )
-            ):
-                return False
-            self.preconfigured_frontends[next_frontend] = next_frontend_candidate
+        result = await self.transitions.submit(
+            TransitionEvent.SWITCHTO,
+            partial(self._switchto, next_frontend),
+            argument=next_frontend,
+        )
+        return result.success
+
+    async def _switchto(self, next_frontend: str) -> tuple[bool, str]:
+        if not (frontend := await self.materialize_frontend(next_frontend)):
+            return False, f"unknown frontend {next_frontend}"
 
         # don't set next frontend if the current and the next_fe are the same
-        if self.frontends[0] is self.preconfigured_frontends.get(next_frontend):
-            return True
+        if self.frontends[0] is frontend:
+            return True, "already active"
         self.set_next_fe(next_frontend)
-        await self.switch()
-        return True
+        return await self._switch()
 
     async def switchbetween(self, frontend_a: str, frontend_b: str):
         if all((frontend_a, frontend_b)):
-            if self.frontends[0] is self.preconfigured_frontends.get(frontend_a):
+            if self.frontends[0] is self.peek_frontend(frontend_a):
                 await self.switchto(frontend_b)
             else:
                 await self.switchto(frontend_a)
@@ -425,12 +836,10 @@ class Controller(NeedsControllerProtocol):
 
     async def set_next(self, next_frontend: str | None):
         if next_frontend is not None:
-            if next_frontend not in self.preconfigured_frontends:
-                self.preconfigured_frontends[next_frontend] = await self.get_frontend(
-                    NamedFrontend(name=next_frontend)
-                )
+            if not (frontend := await self.materialize_frontend(next_frontend)):
+                return False
             # don't set next frontend if the current and the next_fe are the same
-            if self.frontends[0] is self.preconfigured_frontends.get(next_frontend):
+            if self.frontends[0] is frontend:
                 return True
             self.set_next_fe(next_frontend)
             return True
@@ -444,7 +853,7 @@ class Controller(NeedsControllerProtocol):
             # TODO: we are not allowed to subscribe multiple times to
             # the same object, so we need to check if it is already used -
             # this should work for units, we also need to check for apps!
-            fe = self.preconfigured_frontends.get(fe_name)
+            fe = self.peek_frontend(fe_name)
             if not fe:
                 try:
                     self.log.debug("Calling SystemdUnitFrontend")
@@ -458,7 +867,7 @@ class Controller(NeedsControllerProtocol):
                     self.log.exception(e)
                     return False
         else:
-            fe = self.preconfigured_frontends.get(fe_type)
+            fe = self.peek_frontend(fe_type)
             if fe:
                 self.frontends[1] = fe
                 return True
@@ -480,18 +889,36 @@ class Controller(NeedsControllerProtocol):
 
     async def quit(self) -> bool:
         """prepare for shutdown"""
+        result = await self.transitions.submit(TransitionEvent.QUIT, self._quit)
+        return result.success
+
+    async def _quit(self) -> tuple[bool, str]:
         await self.set_frontend_state(FrontendState.QUIT)
         if (
             current_frontend := self.current_frontend
         ) and await current_frontend.frontend_is_running():
-            success, _msg = await self.stop()
-            return success
-        return True
+            return await self._stop()
+        return True, "OK"
 
     async def delay(self, timeout: float, coro: Coroutine[Any, Any, Any]):
-        await asyncio.sleep(timeout)
+        try:
+            await asyncio.sleep(timeout)
+        except asyncio.CancelledError:
+            coro.close()
+            raise
         await self.shutdown_queue.put(coro)
 
+    def schedule_delay(self, timeout: float, coro: Coroutine[Any, Any, Any]) -> None:
+        """
+        run delay() in the background, so it doesn't block a running transition.
+        A delay which is still sleeping is replaced.
+        """
+        if self.delay_task is not None:
+            self.delay_task.cancel()
+        task = self.delay_task = asyncio.create_task(self.delay(timeout, coro))
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
     async def repeat(self, timeout: float, coro: Coroutine[Any, Any, Any]):
         while True:
             await asyncio.sleep(timeout)
@@ -508,7 +935,7 @@ class Controller(NeedsControllerProtocol):
             self.poweroff_timer.stop()
         self.poweroff_timer = None
 
-    async def poweroff(self, args: list[str] | None = None, instant: bool = False):
+    async def poweroff(self, *args: str, instant: bool = False):
         self.log.debug(f"called poweroff({instant=})")
         self.expect_user_activity = True
         self.clear_poweroff_timer()
@@ -531,7 +958,7 @@ class Controller(NeedsControllerProtocol):
         self.log.debug("created shutdown_task")
         return False  # ensure this method isn't called repeatedly
 
-    async def yavdr_compat_poweroff(self, args: list[str] | None = None):
+    async def yavdr_compat_poweroff(self, *args: str):
         """
         switch back to vdr if vdr is not the current frontend otherwise call poweroff
         """
@@ -553,14 +980,19 @@ class Controller(NeedsControllerProtocol):
 
             if stop_on_shutdown:
                 self.log.debug("stop current_frontend: %s", current_frontend.name)
-                await self.set_frontend_state(FrontendState.PREPARE_SHUTDOWN)
-                await self.stop(extern=True)
+                await self.transitions.submit(
+                    TransitionEvent.PREPARE_SHUTDOWN, self._stop_for_shutdown
+                )
             self.poweroff_timer = DelayedRepeatableTask(
                 timeout, self.shutdown_handler.attempt_shutdown
             )
             self.poweroff_timer.start()
         return False  # ensure this method isn't called by a GLib callback again
 
+    async def _stop_for_shutdown(self) -> tuple[bool, str]:
+        await self.set_frontend_state(FrontendState.PREPARE_SHUTDOWN)
+        return await self._stop(extern=True)
+
     async def on_vdr_shutdown_successfull(self) -> bool:
         """
         This method prevents yavdr-frontend from retrying to shut down the system -
@@ -570,7 +1002,7 @@ class Controller(NeedsControllerProtocol):
         self.expect_user_activity = False
         self.clear_poweroff_timer()
         await self.set_background(BackgroundType.NORMAL)
-        vdr_frontend = self.preconfigured_frontends.get("vdr")
+        vdr_frontend = self.peek_frontend("vdr")
         if vdr_frontend:
             await vdr_frontend.reset()
 
@@ -579,6 +1011,9 @@ class Controller(NeedsControllerProtocol):
 
     async def on_xorg_start(self) -> None:
         self.expect_user_activity = True
+        # the Xorg session imports DISPLAY etc. into the systemd environment
+        await self.systemd_environment.refresh()
+        self.background.invalidate()  # the new X server has no background yet
         if (
             self.current_frontend
             and self.current_frontend.startup_state == StartupStateEnum.PREPARE
@@ -605,18 +1040,22 @@ class Controller(NeedsControllerProtocol):
 
         primary_display, secondary_display = load_facts()
         await drm_hotplug(primary_display, secondary_display, self)
+        # an X server started for the new output may have changed the environment
+        await self.systemd_environment.refresh()
+        self.background.invalidate()  # the screen size might have changed
         await asyncio.sleep(0.5)
         await self.set_background(BackgroundType.NORMAL)
         await self.start()
 
     async def switch_displays(self) -> None:
+        await self.transitions.submit(
+            TransitionEvent.SWITCH_DISPLAYS, self._switch_displays
+        )
+
+    async def _switch_displays(self) -> tuple[bool, str]:
         self.log.info("switch displays")
-        env_vars = await self.systemd_manager.environment
-        current_display = None
-        for v in env_vars:
-            if v.startswith("DISPLAY="):
-                _, _, current_display = v.partition("=")
-                break
+        await self.systemd_environment.refresh()
+        current_display = self.systemd_environment.get("DISPLAY")
         if current_display:
             next_display = f"{current_display[: current_display.find('.')]}.{'1' if current_display[-1] == '0' else '0'}"
 
@@ -624,11 +1063,12 @@ class Controller(NeedsControllerProtocol):
                 ["osd2web.service"]
             )
 
-            await self.stop(False)
+            await self._stop(False)
 
             if has_osd2web:
                 await self.systemd_manager.stop_unit("osd2web.service", "replace")
             await self.set_display(next_display)
             if has_osd2web:
                 await self.systemd_manager.start_unit("osd2web.service", "replace")
-            await self.start()
+            return await self._start()
+        return False, "DISPLAY is not set"
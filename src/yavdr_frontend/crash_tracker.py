@@ -0,0 +1,91 @@
+import time
+from collections import deque
+
+
+class CrashTracker:
+    """
+    Sliding window of the unexpected exits of a frontend.
+
+    Every exit within the window doubles the delay before the frontend is
+    started again, once max_exits are reached the frontend is given up.
+    """
+
+    __slots__ = ("window", "max_exits", "backoff", "max_backoff", "exits", "total")
+
+    def __init__(
+        self, window: float, max_exits: int, backoff: float, max_backoff: float
+    ):
+        self.window = window
+        self.max_exits = max_exits
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # (time.monotonic(), result) of the exits within the window
+        self.exits: deque[tuple[float, str]] = deque()
+        self.total = 0
+
+    def _expire(self, now: float) -> None:
+        while self.exits and now - self.exits[0][0] > self.window:
+            self.exits.popleft()
+
+    def record(self, result: str) -> None:
+        now = time.monotonic()
+        self._expire(now)
+        self.exits.append((now, result))
+        self.total += 1
+
+    def recent(self) -> int:
+        self._expire(time.monotonic())
+        return len(self.exits)
+
+    def delay(self) -> float:
+        """seconds to wait before the frontend is started again"""
+        if (recent := self.recent()) <= 1:
+            return 0.0
+        return min(self.backoff * 2 ** (recent - 2), self.max_backoff)
+
+    def exceeded(self) -> bool:
+        return self.recent() >= self.max_exits
+
+    def last_result(self) -> str:
+        return self.exits[-1][1] if self.exits else ""
+
+    def reset(self) -> None:
+        self.exits.clear()
+
+
+class CrashRecorder:
+    """keeps a CrashTracker for every frontend name"""
+
+    def __init__(
+        self, window: float, max_exits: int, backoff: float, max_backoff: float
+    ):
+        self.window = window
+        self.max_exits = max_exits
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.trackers: dict[str, CrashTracker] = {}
+
+    def get(self, name: str) -> CrashTracker:
+        if (tracker := self.trackers.get(name)) is None:
+            tracker = self.trackers[name] = CrashTracker(
+                self.window, self.max_exits, self.backoff, self.max_backoff
+            )
+        return tracker
+
+    def reset(self) -> None:
+        self.trackers.clear()
+
+    def snapshot(self) -> dict[str, tuple[int, int, float, str]]:
+        """
+        return the total number of exits, the exits within the window, the
+        current restart delay in seconds and the last result for every frontend
+        """
+        return {
+            name: (
+                tracker.total,
+                tracker.recent(),
+                tracker.delay(),
+                tracker.last_result(),
+            )
+            for name, tracker in self.trackers.items()
+        }
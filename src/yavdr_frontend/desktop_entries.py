@@ -0,0 +1,255 @@
+import logging
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+from yavdr_frontend.inotify import (
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_DELETE_SELF,
+    IN_IGNORED,
+    IN_ISDIR,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+    IN_ONLYDIR,
+    IN_Q_OVERFLOW,
+    Inotify,
+    InotifyEvent,
+)
+
+_xdg_dirs: list[Path] = []
+if _xdg_data_home := os.getenv("XDG_DATA_HOME"):
+    _xdg_dirs.append(Path(_xdg_data_home) / "applications")
+else:
+    _xdg_dirs.append(Path.home() / ".local/share/applications")
+_xdg_dirs.extend(
+    Path(p) / "applications"
+    # the default of the XDG Base Directory Specification, like GIO uses it
+    for p in (os.getenv("XDG_DATA_DIRS") or "/usr/local/share:/usr/share").split(":")
+    if p
+)
+
+_WATCH_MASK = (
+    IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE | IN_ONLYDIR
+)
+# the nearest existing parent of a missing directory is watched for its creation
+_PARENT_WATCH_MASK = IN_CREATE | IN_MOVED_TO | IN_ONLYDIR
+
+
+def desktop_file_name(desktop_entry: str) -> str:
+    if desktop_entry.endswith(".desktop"):
+        return desktop_entry
+    return f"{desktop_entry}.desktop"
+
+
+class DesktopEntryIndex:
+    """
+    Index of the .desktop files in the XDG application directories.
+
+    Each directory maps the desktop ids (the path relative to the directory with
+    slashes replaced by dashes) and the file names to the files. Like GIO, the
+    first directory which contains a desktop id wins, so a file in the user
+    directory shadows the one with the same id in the system directories.
+
+    The index is built on the first lookup. Once watch() was called from the event
+    loop, it is updated through inotify, otherwise it is rebuilt if a lookup fails.
+    A directory which doesn't exist yet is picked up when it is created.
+    """
+
+    def __init__(self, directories: list[Path]):
+        self.log = logging.getLogger("DesktopEntryIndex")
+        # a directory listed twice (e.g. through a symlink) would share the
+        # inotify watch descriptor, only the first one is used
+        unique: dict[Path, Path] = {}
+        for directory in directories:
+            unique.setdefault(directory.resolve(), directory)
+        self.directories = list(unique.values())
+        # per directory: desktop id -> path and file name -> path
+        self.ids: list[dict[str, Path]] = []
+        self.names: list[dict[str, Path]] = []
+        self.built = False
+        self.inotify: Inotify | None = None
+        # watch descriptor -> (index of the directory, watched path)
+        self.watches: dict[int, tuple[int, Path]] = {}
+        # watch descriptor -> existing parent of missing directories
+        self.parent_watches: dict[int, Path] = {}
+        self.listeners: list[Callable[[str], None]] = []
+
+    def lookup(self, desktop_entry: str) -> Path | None:
+        """return the .desktop file for a desktop id or file name"""
+        rebuilt = not self.built
+        if rebuilt:
+            self.rebuild()
+        path = self._lookup(desktop_entry)
+        if path is None and self.inotify is None and not rebuilt:
+            # without inotify the index might be outdated
+            self.rebuild()
+            path = self._lookup(desktop_entry)
+        return path
+
+    def _lookup(self, desktop_entry: str) -> Path | None:
+        desktop_file = desktop_file_name(desktop_entry)
+        for ids in self.ids:
+            if path := ids.get(desktop_file):
+                return path
+        for names in self.names:
+            if path := names.get(desktop_file):
+                return path
+        return None
+
+    def desktop_id(self, path: Path) -> str | None:
+        """return the desktop id of a .desktop file in the application directories"""
+        for directory in self.directories:
+            if path.is_relative_to(directory):
+                return "-".join(path.relative_to(directory).parts)
+        return None
+
+    def _desktop_id(self, i: int, path: Path) -> str:
+        return "-".join(path.relative_to(self.directories[i]).parts)
+
+    def rebuild(self) -> None:
+        self.ids = [{} for _ in self.directories]
+        self.names = [{} for _ in self.directories]
+        for wd in (*self.watches, *self.parent_watches):
+            self._rm_watch(wd)
+        self.watches.clear()
+        self.parent_watches.clear()
+        for i, directory in enumerate(self.directories):
+            if directory.is_dir():
+                self._scan(i, directory)
+            else:
+                self._watch_parent(directory)
+        self.built = True
+        self.log.debug("indexed %d .desktop files", sum(len(ids) for ids in self.ids))
+
+    def _scan(self, i: int, path: Path) -> None:
+        """add the .desktop files below path to the index of directory i"""
+        for root, dirs, files in os.walk(path):
+            self._add_watch(i, Path(root))
+            dirs.sort()  # a deterministic order for duplicate file names
+            for name in sorted(files):
+                if name.endswith(".desktop"):
+                    self._add(i, Path(root, name))
+
+    def _add(self, i: int, path: Path) -> None:
+        self.ids[i][self._desktop_id(i, path)] = path
+        self.names[i].setdefault(path.name, path)
+
+    def _remove(self, i: int, path: Path) -> None:
+        """remove path and all files below it from the index of directory i"""
+        ids = self.ids[i]
+        for desktop_id in [k for k, v in ids.items() if v.is_relative_to(path)]:
+            del ids[desktop_id]
+        names = self.names[i]
+        for name in [k for k, v in names.items() if v.is_relative_to(path)]:
+            del names[name]
+            # another file with the same name might be left in a subdirectory
+            for other in ids.values():
+                if other.name == name:
+                    names[name] = other
+                    break
+
+    def watch(self) -> None:
+        """update the index through inotify, must be called from the event loop"""
+        if self.inotify is not None:
+            return
+        try:
+            self.inotify = Inotify(self._on_event)
+        except OSError as e:
+            self.log.warning(f"can't watch the XDG application directories: {e}")
+            return
+        self.rebuild()
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        """call callback with the file name for every changed .desktop file"""
+        self.listeners.append(callback)
+
+    def _add_watch(self, i: int, path: Path) -> None:
+        if self.inotify is None:
+            return
+        try:
+            wd = self.inotify.add_watch(path, _WATCH_MASK)
+        except OSError as e:
+            self.log.debug(f"can't watch {path}: {e}")
+        else:
+            self.watches[wd] = (i, path)
+
+    def _watch_parent(self, directory: Path) -> None:
+        if self.inotify is None:
+            return
+        parent = directory.parent
+        while not parent.is_dir() and parent != parent.parent:
+            parent = parent.parent
+        if parent in self.parent_watches.values():
+            return
+        try:
+            wd = self.inotify.add_watch(parent, _PARENT_WATCH_MASK)
+        except OSError as e:
+            self.log.debug(f"can't watch {parent}: {e}")
+        else:
+            self.parent_watches[wd] = parent
+
+    def _rm_watch(self, wd: int) -> None:
+        if self.inotify is not None:
+            try:
+                self.inotify.rm_watch(wd)
+            except OSError:
+                pass  # the directory is already gone
+
+    def _on_event(self, event: InotifyEvent) -> None:
+        if event.mask & IN_Q_OVERFLOW:
+            self.log.debug("inotify queue overflow, rebuilding the index")
+            self.rebuild()
+            self._notify("")
+            return
+        if (parent := self.parent_watches.get(event.wd)) is not None:
+            if event.mask & IN_IGNORED:
+                # the parent has been removed, too
+                del self.parent_watches[event.wd]
+                self.rebuild()
+            elif any(d.is_relative_to(parent / event.name) for d in self.directories):
+                self.log.debug(f"{parent / event.name} created, rebuilding the index")
+                self.rebuild()
+                self._notify("")
+            return
+        if event.mask & (IN_IGNORED | IN_DELETE_SELF):
+            watch = self.watches.pop(event.wd, None)
+            if watch is not None and watch[1] == self.directories[watch[0]]:
+                # the directory has been removed, watch the parent for it to return
+                self.rebuild()
+                self._notify("")
+            return
+        if (watch := self.watches.get(event.wd)) is None:
+            return
+        i, directory = watch
+        path = directory / event.name
+        if event.mask & IN_ISDIR:
+            if event.mask & (IN_DELETE | IN_MOVED_FROM):
+                for wd in [
+                    wd for wd, (_, p) in self.watches.items() if p.is_relative_to(path)
+                ]:
+                    self._rm_watch(wd)
+                    del self.watches[wd]
+                self._remove(i, path)
+            elif event.mask & (IN_CREATE | IN_MOVED_TO):
+                self._scan(i, path)
+            self._notify("")
+            return
+        if not event.name.endswith(".desktop"):
+            return
+        if event.mask & (IN_DELETE | IN_MOVED_FROM):
+            self._remove(i, path)
+        elif event.mask & (IN_CREATE | IN_MOVED_TO):
+            self._add(i, path)
+        self._notify(event.name)
+
+    def _notify(self, name: str) -> None:
+        for callback in self.listeners:
+            try:
+                callback(name)
+            except Exception as e:
+                self.log.exception(e)
+
+
+desktop_entries = DesktopEntryIndex(_xdg_dirs)
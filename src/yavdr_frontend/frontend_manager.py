@@ -1,16 +1,19 @@
-from pathlib import Path
-import subprocess
+import asyncio
+from collections.abc import Collection
+from functools import partial
+import time
 from yavdr_frontend.basicfrontend import FrontendProtocol
 from yavdr_frontend.config import (
+    DBusEnum,
     DesktopAppFrontendConfig,
     FrontendConfig,
+    LaunchModeEnum,
     ModuleFrontendConfig,
     NamedFrontend,
     UnitFrontendConfig,
 )
-from yavdr_frontend.interfaces.systemd_dbus_interface import (
-    create_systemd_manager_proxy,
-)
+from yavdr_frontend.desktop_entries import desktop_entries
+from yavdr_frontend.loghandler import create_log_handler
 
 from typing import TYPE_CHECKING
 
@@ -19,27 +22,216 @@ if TYPE_CHECKING:
     from yavdr_frontend.controller import Controller
     from yavdr_frontend.vdr_controller import VDRController
 from yavdr_frontend.systemdfrontend import SystemdUnitFrontend
-from yavdr_frontend.tools import get_DesktopAppInfo, get_bus, get_object_from_module
+from yavdr_frontend.transient_app import TransientAppFrontend, transient_unit_name
+from yavdr_frontend.unit_files import get_unit_file_catalogue
+from yavdr_frontend.tools import get_DesktopAppInfo, get_object_from_module
+from yavdr_frontend.unit_names import systemd_escape_template
+
+# names which could not be resolved are not looked up again for this time (in seconds)
+NEGATIVE_CACHE_TTL = 60.0
+
+
+def normalize_frontend_config(config: FrontendConfig) -> FrontendConfig:
+    """return a config which compares equal for all spellings of the same frontend"""
+    if isinstance(config, UnitFrontendConfig):
+        unit_name = config.unit_name.strip()
+        if not unit_name.endswith(".service"):  # like SystemdUnitFrontend
+            unit_name = f"{unit_name}.service"
+        if unit_name != config.unit_name:
+            return config.model_copy(update={"unit_name": unit_name})
+    elif isinstance(config, NamedFrontend):
+        if (name := config.name.strip()) != config.name:
+            return config.model_copy(update={"name": name})
+    elif isinstance(config, DesktopAppFrontendConfig):
+        if (app_name := config.app_name.strip()) != config.app_name:
+            return config.model_copy(update={"app_name": app_name})
+    return config
+
+
+class FrontendRegistry:
+    """
+    Cache of the created frontends.
+
+    Frontends are stored by their normalized config. Names which could not be
+    resolved are remembered for NEGATIVE_CACHE_TTL seconds, so repeated requests
+    for a missing application don't query systemd and the .desktop files each time.
+    Name lookups (NamedFrontend) and failures are dropped when the unit files or
+    the XDG application directories change, as the name might resolve differently
+    now. The frontends created for explicit configs stay valid.
+    """
+
+    def __init__(self, negative_ttl: float = NEGATIVE_CACHE_TTL):
+        self.log = create_log_handler("FrontendRegistry")
+        self.negative_ttl = negative_ttl
+        self.frontends: dict[FrontendConfig, FrontendProtocol] = {}
+        # frontends which are being created, concurrent requests share the task
+        self.pending: dict[FrontendConfig, asyncio.Task[FrontendProtocol]] = {}
+        # configs which could not be resolved: (expiry time, error message)
+        self.unresolved: dict[FrontendConfig, tuple[float, str]] = {}
+        self.watched_buses: set[DBusEnum] = set()
+        self.watching_desktop_entries = False
+
+    def get(self, config: FrontendConfig) -> FrontendProtocol | None:
+        return self.frontends.get(normalize_frontend_config(config))
+
+    def add(self, config: FrontendConfig, frontend: FrontendProtocol) -> None:
+        config = normalize_frontend_config(config)
+        self.frontends[config] = frontend
+        self.unresolved.pop(config, None)
+
+    def discard(self, config: FrontendConfig, frontend: FrontendProtocol) -> None:
+        """remove the frontend from the registry if it is stored for config"""
+        config = normalize_frontend_config(config)
+        if self.frontends.get(config) is frontend:
+            del self.frontends[config]
+        # drop name lookups which point to the frontend, too
+        for key in [k for k, v in self.frontends.items() if v is frontend]:
+            del self.frontends[key]
 
-known_frontends: dict[FrontendConfig, FrontendProtocol] = {}
+    def check_unresolved(self, config: FrontendConfig) -> None:
+        """raise a ValueError if config could not be resolved recently"""
+        if entry := self.unresolved.get(config):
+            expiry, message = entry
+            if time.monotonic() < expiry:
+                raise ValueError(message)
+            del self.unresolved[config]
 
+    def add_unresolved(self, config: FrontendConfig, message: str) -> None:
+        self.unresolved[config] = (time.monotonic() + self.negative_ttl, message)
 
-def systemd_escape_app(app_name: str):
-    result = subprocess.run(
-        ["systemd-escape", "--template=app@.service", app_name],
-        universal_newlines=True,
-        capture_output=True,
-    )
-    # print(result)
-    return result.stdout.strip()
+    def invalidate(self, reason: str) -> None:
+        """drop all name lookups and failures"""
+        if self.unresolved or any(isinstance(c, NamedFrontend) for c in self.frontends):
+            self.log.debug(f"invalidating name lookups: {reason}")
+        self.unresolved.clear()
+        for config in [c for c in self.frontends if isinstance(c, NamedFrontend)]:
+            del self.frontends[config]
+
+    def watch(self, bus: DBusEnum) -> None:
+        """invalidate the name lookups if the unit files on bus or the .desktop files change"""
+        if bus in self.watched_buses:
+            return
+        self.watched_buses.add(bus)
+        catalogue = get_unit_file_catalogue(bus)
+        catalogue.subscribe(self.invalidate)
+        catalogue.watch()
+        if not self.watching_desktop_entries:
+            self.watching_desktop_entries = True
+            desktop_entries.subscribe(self._on_desktop_entry_changed)
+            desktop_entries.watch()
+
+    def _on_desktop_entry_changed(self, name: str) -> None:
+        self.invalidate(f"{name or 'application directory'} changed")
+
+
+registry = FrontendRegistry()
+
+
+class FrontendDescriptor:
+    """
+    A configured frontend which is only created when it is needed.
+    Frontends without a config (e.g. the fallback frontend) can't be released.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        config: FrontendConfig | None,
+        frontend: FrontendProtocol | None = None,
+    ):
+        self.name = name
+        self.config = config
+        self.frontend = frontend
+        self.last_used = time.monotonic()
+
+    def __repr__(self) -> str:
+        return f"FrontendDescriptor<{self.name}, {self.frontend=}>"
+
+    def peek(self) -> FrontendProtocol | None:
+        """return the frontend if it has been created already"""
+        if self.frontend is None and self.config is not None:
+            self.frontend = registry.get(self.config)
+        return self.frontend
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+
+    async def materialize(
+        self, controller: "Controller | VDRController"
+    ) -> FrontendProtocol:
+        """return the frontend, it is created on the first call"""
+        self.touch()
+        if (frontend := self.peek()) is None:
+            assert self.config is not None
+            frontend = self.frontend = await system_frontend_factory(
+                self.config, controller
+            )
+        return frontend
+
+    def is_releasable(
+        self, idle_time: float, references: Collection[FrontendProtocol] = ()
+    ) -> bool:
+        """
+        references are the frontends held elsewhere, a frontend in it is kept
+        because release() closes it
+        """
+        # NOTE: other frontends might have tasks and signal subscriptions which
+        #       need to be cleaned up, so only idle unit frontends are released
+        return (
+            self.config is not None
+            and isinstance(self.frontend, SystemdUnitFrontend)
+            and not any(frontend is self.frontend for frontend in references)
+            and not self.frontend.is_active
+            and self.frontend.frozen_since is None  # evicted on memory pressure
+            and time.monotonic() - self.last_used >= idle_time
+        )
+
+    def release(self) -> None:
+        """drop the frontend, it is created again on the next use"""
+        if self.config is not None and self.frontend is not None:
+            registry.discard(self.config, self.frontend)
+            if isinstance(self.frontend, SystemdUnitFrontend):
+                self.frontend.close()
+        self.frontend = None
+
+
+def systemd_escape_app(app_name: str) -> str:
+    return systemd_escape_template("app@.service", app_name)
 
 
 async def system_frontend_factory(
     config: FrontendConfig, controller: "Controller | VDRController"
 ) -> FrontendProtocol:
-    global known_frontends
-    if frontend := known_frontends.get(config):
+    config = normalize_frontend_config(config)
+    if frontend := registry.get(config):
         return frontend
+    registry.check_unresolved(config)
+    registry.watch(controller.config.main.systemd_bus)
+    if (task := registry.pending.get(config)) is None:
+        task = registry.pending[config] = asyncio.create_task(
+            create_frontend(config, controller)
+        )
+        task.add_done_callback(partial(_frontend_created, config))
+    # NOTE: the creation continues if the caller is cancelled (e.g. by a timeout),
+    #       so a later request can pick up the result
+    return await asyncio.shield(task)
+
+
+def _frontend_created(
+    config: FrontendConfig, task: asyncio.Task[FrontendProtocol]
+) -> None:
+    registry.pending.pop(config, None)
+    if task.cancelled():
+        return
+    if (e := task.exception()) is None:
+        registry.add(config, task.result())
+    elif isinstance(e, ValueError) and isinstance(config, NamedFrontend):
+        registry.add_unresolved(config, str(e))
+
+
+async def create_frontend(
+    config: FrontendConfig, controller: "Controller | VDRController"
+) -> FrontendProtocol:
     # NOTE: we need to await the SystemUnitFrontend initialization to get the async operations done
     if isinstance(config, UnitFrontendConfig):
         unit_name = config.unit_name
@@ -48,10 +240,30 @@ async def system_frontend_factory(
                 unit_name=unit_name,
                 use_pwsuspend=config.use_pwsuspend,
                 bus=config.bus,
+                suspend_mode=config.suspend_mode,
+                start_timeout=config.start_timeout,
+                stop_timeout=config.stop_timeout,
             ),
             controller=controller,
             fe_type="unit",
         )
+    elif (
+        isinstance(config, DesktopAppFrontendConfig)
+        and config.launch_mode is LaunchModeEnum.TRANSIENT
+    ):
+        frontend = await TransientAppFrontend(
+            config.app_name,
+            UnitFrontendConfig(
+                unit_name=transient_unit_name(config.app_name),
+                use_pwsuspend=config.use_pwsuspend,
+                bus=config.bus,
+                suspend_mode=config.suspend_mode,
+                start_timeout=config.start_timeout,
+                stop_timeout=config.stop_timeout,
+            ),
+            controller=controller,
+            fe_type="app",
+        )
     elif isinstance(config, DesktopAppFrontendConfig):
         # unit_name = f"app@{config.app_name}.service"  # TODO: do we need to escape this?
         unit_name = systemd_escape_app(app_name=config.app_name)
@@ -60,6 +272,9 @@ async def system_frontend_factory(
                 unit_name=unit_name,
                 use_pwsuspend=config.use_pwsuspend,
                 bus=config.bus,
+                suspend_mode=config.suspend_mode,
+                start_timeout=config.start_timeout,
+                stop_timeout=config.stop_timeout,
             ),
             controller=controller,
             fe_type="app",
@@ -90,40 +305,32 @@ async def system_frontend_factory(
                                 app_name=id,
                                 use_pwsuspend=config.use_pwsuspend,
                                 bus=controller.config.main.systemd_bus,
+                                launch_mode=controller.config.main.app_launch_mode,
                             ),
                             controller=controller,
                         )
             # is ist a systemd service?
             elif config.name.endswith(".service"):
-                return await SystemdUnitFrontend(
-                    config=UnitFrontendConfig(
+                return await system_frontend_factory(
+                    UnitFrontendConfig(
                         unit_name=config.name,
                         use_pwsuspend=config.use_pwsuspend,
                         bus=config.bus,
                     ),
-                    controller=controller,
-                    fe_type="unit",
+                    controller,
                 )
             else:
                 # TODO: we need to guess - is it a systend unit?
-                systemd_manager_proxy = create_systemd_manager_proxy(
-                    bus=get_bus(controller.config.main.systemd_bus)
-                )
-                units = await systemd_manager_proxy.list_unit_files_by_patterns(
-                    [], [(unit_name := f"{config.name}.service")]
-                )
-                for unit_path, _t in units:
-                    p = Path(unit_path)
-                    if p.name == unit_name:
-                        return await SystemdUnitFrontend(
-                            config=UnitFrontendConfig(
-                                unit_name=unit_name,
-                                use_pwsuspend=config.use_pwsuspend,
-                                bus=controller.config.main.systemd_bus,
-                            ),
-                            controller=controller,
-                            fe_type="unit",
-                        )
+                catalogue = get_unit_file_catalogue(controller.config.main.systemd_bus)
+                if await catalogue.contains(unit_name := f"{config.name}.service"):
+                    return await system_frontend_factory(
+                        UnitFrontendConfig(
+                            unit_name=unit_name,
+                            use_pwsuspend=config.use_pwsuspend,
+                            bus=controller.config.main.systemd_bus,
+                        ),
+                        controller,
+                    )
                 #
 
             raise ValueError(f"unknown frontend name for {config=}")
@@ -153,5 +360,4 @@ async def system_frontend_factory(
 
     if not frontend:
         raise ValueError("Unknown Frontend")
-    known_frontends[config] = frontend
     return frontend
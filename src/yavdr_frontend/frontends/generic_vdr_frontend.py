@@ -1,3 +1,4 @@
+import asyncio
 from enum import IntEnum
 import logging
 import time
@@ -90,13 +91,12 @@ class SofthdBaseClass(GenericVDRFrontend):
         self.log.debug("use_pwsuspend is %s", self.use_pwsuspend)
 
     async def __async_init__(self):
-        self.plugin_proxy = DeTvdrVdrPluginInterface.new_proxy(
-            "de.tvdr.vdr",
-            f"/Plugins/{self.name}",
-            bus=self.vdrcontroller.dbus2vdr.vdr_bus,
-        )
         return self
 
+    @property
+    def plugin_proxy(self) -> DeTvdrVdrPluginInterface:
+        return self.dbus2vdr.plugin_proxy(self.name)
+
     async def svdrpcmd(
         self, action: str, options: str = ""
     ) -> tuple[int, str] | tuple[None, None]:
@@ -109,6 +109,18 @@ class SofthdBaseClass(GenericVDRFrontend):
                 self.log.debug(e)
         return None, None
 
+    async def svdrpcmds(
+        self, *commands: tuple[str, str]
+    ) -> list[tuple[int, str]] | list[tuple[None, None]]:
+        """Send independent (action, options) svdrpcommands at once if vdr runs"""
+        if await self.vdrcontroller.vdr_status.is_running():
+            try:
+                return await self.dbus2vdr.svdrpcommands(self.name, *commands)
+            except Exception as e:
+                self.log.warning("DBus communication failed!")
+                self.log.debug(e)
+        return [(None, None)] * len(commands)
+
     async def atta(self, options: str | None = None):
         """
         ATTA <-d display> <-a audio> <-p pass>
@@ -176,6 +188,7 @@ class SofthdBaseClass(GenericVDRFrontend):
         self.log.debug(
             f'change_state with command {action} and options "{options}" to {expected_state}'
         )
+        # the state is only queried after the action has been answered
         if code == 900 and await self.check_state() == expected_state:
             self.log.debug("%s successfully %s", self.name, logmsg)
             self.active = True
@@ -195,12 +208,18 @@ class SofthdBaseClass(GenericVDRFrontend):
                 options = " ".join(options)
         else:
             options = ""
-        self.log.debug(f"{await self.status()=}, {await self.resume()=}")
-        if not await self.frontend_is_running() and not await self.resume():
+        # the state and the primary device don't depend on each other
+        state, primary = await asyncio.gather(
+            self.check_state(), self.dbus2vdr.vdr_device.get_primary()
+        )
+        self.log.debug(f"{state=}")
+        if state == SofthddeviceStatusEnum.SUSPEND_NORMAL:
+            result = await self.resume(state)
+        elif state != SofthddeviceStatusEnum.ATTACHED:
             result = await self.atta(options)
         else:
             result = False
-        await self.make_primary()
+        await self.make_primary(VDRDevice(*primary))
         return result
 
     async def stop(self, options: str = "") -> bool:
@@ -222,12 +241,14 @@ class SofthdBaseClass(GenericVDRFrontend):
             self.log.debug(e)
         return False
 
-    async def resume(self) -> bool:
+    async def resume(self, state: SofthddeviceStatusEnum | None = None) -> bool:
         """
         if softhdcuvid is suspended, attach it
         returns True if the frontend was attached, otherwise False
         """
-        if await self.check_state() == SofthddeviceStatusEnum.SUSPEND_NORMAL:
+        if state is None:
+            state = await self.check_state()
+        if state == SofthddeviceStatusEnum.SUSPEND_NORMAL:
             result = await self.change_state(
                 "resu", expected_state=SofthddeviceStatusEnum.ATTACHED, logmsg="resumed"
             )
@@ -258,13 +279,15 @@ class SofthdBaseClass(GenericVDRFrontend):
     async def frontend_is_running(self) -> bool:
         return await self.status() == FrontendStatusEnum.ACTIVE
 
-    async def make_primary(self):
+    async def make_primary(self, device: VDRDevice | None = None):
+        """make the plugin the primary device, device is the current one if known"""
         ts_start = time.time()
         while True:
             # device_index and device_number are integers,
             # hasDecoder and isPrimary are boolean,
             # and device_name is a string
-            device = VDRDevice(*(await self.dbus2vdr.vdr_device.get_primary()))
+            if device is None:
+                device = VDRDevice(*(await self.dbus2vdr.vdr_device.get_primary()))
 
             self.log.debug(
                 (
@@ -288,6 +311,7 @@ class SofthdBaseClass(GenericVDRFrontend):
                         f"can't set primary device: no device with name '{self.name}'"
                     )
                 time.sleep(0.25)
+                device = None
             else:
                 self.log.debug(f"{self.name} is the primary device")
                 self.log.debug(
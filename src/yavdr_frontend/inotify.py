@@ -0,0 +1,90 @@
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+from collections.abc import Callable
+from pathlib import Path
+from typing import NamedTuple
+
+# see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+IN_CLOEXEC = os.O_CLOEXEC
+IN_NONBLOCK = os.O_NONBLOCK
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+_libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+_libc.inotify_init1.argtypes = (ctypes.c_int,)
+_libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+_libc.inotify_rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+
+
+class InotifyEvent(NamedTuple):
+    wd: int
+    mask: int
+    cookie: int
+    name: str
+
+
+def _check(result: int, msg: str) -> int:
+    if result < 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{msg}: {os.strerror(errno)}")
+    return result
+
+
+class Inotify:
+    """
+    Minimal asyncio integration of the inotify API.
+    The callback is called from the event loop for every event.
+    """
+
+    def __init__(self, callback: Callable[[InotifyEvent], None]):
+        self.callback = callback
+        self.fd = _check(_libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC), "inotify_init1")
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(self.fd, self._read_events)
+
+    def add_watch(self, path: str | Path, mask: int) -> int:
+        """watch path for the events in mask, returns the watch descriptor"""
+        return _check(
+            _libc.inotify_add_watch(self.fd, os.fsencode(path), mask),
+            f"inotify_add_watch({path})",
+        )
+
+    def rm_watch(self, wd: int) -> None:
+        _check(_libc.inotify_rm_watch(self.fd, wd), "inotify_rm_watch")
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            self.loop.remove_reader(self.fd)
+            os.close(self.fd)
+            self.fd = -1
+
+    def _read_events(self) -> None:
+        while self.fd >= 0:  # a callback might close the instance
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                self.callback(InotifyEvent(wd, mask, cookie, name))
@@ -15,11 +15,12 @@ from sdbus import (
 
 SYSTEMD_DBUS_INTERFACE = "org.freedesktop.systemd1"
 SYSTEMD_DBUS_MANAGER_OBJECT_PATH = "/org/freedesktop/systemd1"
+SYSTEMD_DBUS_MANAGER_INTERFACE = "org.freedesktop.systemd1.Manager"
 
 
 class OrgFreedesktopSystemd1ManagerInterface(
     DbusInterfaceCommonAsync,
-    interface_name="org.freedesktop.systemd1.Manager",
+    interface_name=SYSTEMD_DBUS_MANAGER_INTERFACE,
 ):
     @dbus_method_async(
         input_signature="s",
@@ -11,6 +11,7 @@ import sdbus
 from typing import TYPE_CHECKING
 
 from yavdr_frontend.config import Config
+from yavdr_frontend.latency import LATENCY_BUCKETS_MS
 from yavdr_frontend.lirc import handle_lirc_connection
 from yavdr_frontend.run_desktop import run_desktop
 
@@ -220,6 +221,63 @@ class yaVDRFrontendInterface(
     async def switch_displays(self) -> None:
         return await self.controller.switch_displays()
 
+    @dbus_method_async(result_signature="b", flags=sdbus.DbusUnprivilegedFlag)
+    async def reload_keymap(self) -> bool:
+        # read the keymap from the configuration file again
+        return await self.controller.reload_keymap()
+
+    @dbus_method_async(result_signature="a{st}", flags=sdbus.DbusUnprivilegedFlag)
+    async def key_statistics(self) -> dict[str, int]:
+        # counters of the key action queue (processed, dropped, coalesced, pending)
+        return self.controller.key_queue.statistics()
+
+    @dbus_method_async(
+        result_signature="ata{s(attt)}", flags=sdbus.DbusUnprivilegedFlag
+    )
+    async def key_latency(
+        self,
+    ) -> tuple[list[int], dict[str, tuple[list[int], int, int, int]]]:
+        # latency from the reception of a key event until its action has finished:
+        # the bucket bounds in µs and for every action the bucket counts
+        # (including a last bucket for larger values), count, sum and max in µs
+        return (
+            [ms * 1000 for ms in LATENCY_BUCKETS_MS],
+            self.controller.key_latency.snapshot(),
+        )
+
+    @dbus_method_async(flags=sdbus.DbusUnprivilegedFlag)
+    async def reset_key_latency(self) -> None:
+        self.controller.key_latency.reset()
+
+    @dbus_method_async(result_signature="a{s(uuds)}", flags=sdbus.DbusUnprivilegedFlag)
+    async def crashes(self) -> dict[str, tuple[int, int, float, str]]:
+        # unexpected exits of the frontends: total count, count within the crash
+        # window, the current restart delay in seconds and the last result
+        return self.controller.crashes.snapshot()
+
+    @dbus_method_async(flags=sdbus.DbusUnprivilegedFlag)
+    async def reset_crashes(self) -> None:
+        self.controller.crashes.reset()
+
+    @dbus_method_async(result_signature="a(sssbsds)", flags=sdbus.DbusUnprivilegedFlag)
+    async def transitions(
+        self,
+    ) -> list[tuple[str, str, str, bool, str, float, str]]:
+        # the last frontend transitions: event, argument, outcome, success, message,
+        # duration in seconds and the controller state afterwards
+        return [
+            (
+                result.event,
+                result.argument,
+                result.outcome,
+                result.success,
+                result.message,
+                result.duration,
+                result.state.name,
+            )
+            for result in self.controller.transitions.history
+        ]
+
     @dbus_property_async(property_signature="s")
     def current_frontend(self) -> str:
         return (
@@ -228,6 +286,14 @@ class yaVDRFrontendInterface(
             else ""
         )
 
+    @dbus_property_async(property_signature="s")
+    def lirc_connection_state(self) -> str:
+        return self.controller.lirc.state
+
+    @dbus_property_async(property_signature="u")
+    def lirc_reconnect_count(self) -> int:
+        return self.controller.lirc.reconnect_count
+
 
 async def export_frontend(config: Config, controller: "Controller"):
     print("open dbus connection ...")
@@ -253,7 +319,7 @@ async def export_frontend(config: Config, controller: "Controller"):
     print("Taskgroup returned")
 
 
-async def on_keypress(cmd: str):
+def on_keypress(cmd: str, received_ns: int):
     print(f"got lirc {cmd=}")
 
 
@@ -0,0 +1,162 @@
+import asyncio
+import inspect
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable, Mapping
+from functools import partial
+from typing import Any, NamedTuple, NoReturn
+
+from yavdr_frontend.config import KeymapConfig, KeyPolicyEnum
+
+
+class KeyBinding(NamedTuple):
+    key_name: str
+    action: str
+    args: tuple[str, ...]
+    call: Callable[[], Awaitable[Any]]
+    policy: KeyPolicyEnum = KeyPolicyEnum.DROP_IF_BUSY
+
+
+def compile_key_binding(
+    target: object, key_name: str, entry: KeymapConfig
+) -> KeyBinding:
+    """
+    bind the action of a keymap entry to a method of target.
+    Raises a ValueError if the action does not exist or doesn't accept the
+    configured arguments.
+    """
+    if entry.action.startswith("_"):
+        raise ValueError(f"{key_name}: action '{entry.action}' is not allowed")
+    func = getattr(target, entry.action, None)
+    if not callable(func):
+        raise ValueError(f"{key_name}: unknown action '{entry.action}'")
+    args = tuple(entry.args)
+    try:
+        inspect.signature(func).bind(*args)
+    except TypeError as err:
+        raise ValueError(
+            f"{key_name}: invalid arguments {args} for action '{entry.action}': {err}"
+        ) from err
+
+    if inspect.iscoroutinefunction(func):
+        call = partial(func, *args)
+    else:
+
+        async def call() -> Any:
+            return func(*args)
+
+    return KeyBinding(
+        key_name=key_name,
+        action=entry.action,
+        args=args,
+        call=call,
+        policy=entry.policy,
+    )
+
+
+def compile_keymap(
+    target: object, keymap: Mapping[str, KeymapConfig], log: logging.Logger
+) -> dict[str, KeyBinding]:
+    """
+    return a dispatch table for all valid keymap entries,
+    invalid entries are logged and skipped
+    """
+    bindings: dict[str, KeyBinding] = {}
+    for key_name, entry in keymap.items():
+        try:
+            bindings[key_name] = compile_key_binding(target, key_name, entry)
+        except ValueError as err:
+            log.error(f"ignoring keymap entry: {err}")
+    return bindings
+
+
+class KeyActionQueue:
+    """
+    Run the actions for key presses one after another in a single consumer task.
+
+    submit() is called for every accepted key press and applies the policy of the
+    key's binding. Keys without a binding only signal user activity, so all of
+    them share one pending slot. A drop-if-busy key press for the action which is
+    running is merged with it instead of being dropped, like the transition engine
+    merges a second toggle with a running one, so it doesn't undo the action.
+    """
+
+    def __init__(
+        self,
+        on_keypress: Callable[[str, int], Awaitable[None]],
+        get_binding: Callable[[str], KeyBinding | None],
+        maxsize: int,
+        log: logging.Logger,
+    ):
+        self.on_keypress = on_keypress
+        self.get_binding = get_binding
+        self.maxsize = maxsize
+        self.log = log
+        # pending key presses as (action or None for unbound keys, key name,
+        # monotonic timestamp of the key event in nanoseconds)
+        self._pending: deque[tuple[str | None, str, int]] = deque()
+        self._wakeup = asyncio.Event()
+        self._busy = False
+        # the action of the running key press, None for unbound keys
+        self._running: str | None = None
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def is_busy(self) -> bool:
+        return self._busy or bool(self._pending)
+
+    def submit(self, key_name: str, received_ns: int) -> bool:
+        """queue a key press, returns False if it has been dropped"""
+        if binding := self.get_binding(key_name):
+            action, policy = binding.action, binding.policy
+        else:
+            action, policy = None, KeyPolicyEnum.COALESCE_LATEST
+
+        if policy is KeyPolicyEnum.DROP_IF_BUSY and self.is_busy():
+            if self._busy and not self._pending and action == self._running:
+                self.coalesced += 1
+                self.log.debug("merged %s with the running key action", key_name)
+                return True
+            self.dropped += 1
+            self.log.debug("dropping %s, another key action is running", key_name)
+            return False
+        if policy is KeyPolicyEnum.COALESCE_LATEST:
+            for idx, (pending_action, *_) in enumerate(self._pending):
+                if pending_action == action:
+                    self._pending[idx] = (action, key_name, received_ns)
+                    self.coalesced += 1
+                    self.log.debug("coalesced %s with a pending key press", key_name)
+                    return True
+        if len(self._pending) >= self.maxsize:
+            self.dropped += 1
+            self.log.warning("dropping %s, key action queue is full", key_name)
+            return False
+        self._pending.append((action, key_name, received_ns))
+        self._wakeup.set()
+        return True
+
+    def statistics(self) -> dict[str, int]:
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "pending": len(self._pending),
+        }
+
+    async def run(self) -> NoReturn:
+        while True:
+            while not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            action, key_name, received_ns = self._pending.popleft()
+            self._busy = True
+            self._running = action
+            try:
+                await self.on_keypress(key_name, received_ns)
+            except Exception as err:
+                self.log.exception(err)
+            finally:
+                self._busy = False
+                self._running = None
+                self.processed += 1
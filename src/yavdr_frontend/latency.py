@@ -0,0 +1,53 @@
+from bisect import bisect_left
+
+# upper bounds of the histogram buckets in milliseconds, the last bucket of a
+# histogram counts all values above the largest bound
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+_BUCKET_BOUNDS_NS = tuple(ms * 1_000_000 for ms in LATENCY_BUCKETS_MS)
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "count", "sum_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKET_BOUNDS_NS) + 1)
+        self.count = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def record(self, latency_ns: int) -> None:
+        self.counts[bisect_left(_BUCKET_BOUNDS_NS, latency_ns)] += 1
+        self.count += 1
+        self.sum_ns += latency_ns
+        if latency_ns > self.max_ns:
+            self.max_ns = latency_ns
+
+
+class LatencyRecorder:
+    """keeps a latency histogram for every action name"""
+
+    def __init__(self):
+        self.histograms: dict[str, LatencyHistogram] = {}
+
+    def record(self, name: str, latency_ns: int) -> None:
+        if (histogram := self.histograms.get(name)) is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.record(latency_ns)
+
+    def reset(self) -> None:
+        self.histograms.clear()
+
+    def snapshot(self) -> dict[str, tuple[list[int], int, int, int]]:
+        """
+        return the bucket counts, the number of values, the sum and the maximum
+        (both in microseconds) for every action name
+        """
+        return {
+            name: (
+                list(histogram.counts),
+                histogram.count,
+                histogram.sum_ns // 1000,
+                histogram.max_ns // 1000,
+            )
+            for name, histogram in self.histograms.items()
+        }
@@ -1,114 +1,323 @@
 import asyncio
-from collections.abc import Awaitable
+import enum
 from functools import partial
 import logging
+import random
 import time
 from typing import NoReturn
 from collections.abc import Callable
+from yavdr_frontend.inotify import (
+    IN_ATTRIB,
+    IN_CREATE,
+    IN_IGNORED,
+    IN_MOVED_TO,
+    IN_ONLYDIR,
+    Inotify,
+    InotifyEvent,
+)
 from yavdr_frontend.loghandler import create_log_handler
 from yavdr_frontend.config import (
     Config,
+    KeyRepeatConfig,
     LircConfig,
     load_yaml,
 )
 
+NS_PER_SECOND = 1_000_000_000
+
+# called with the key name and the time.monotonic_ns() timestamp of its reception
+KeypressCallback = Callable[[str, int], object]
+
+
+class KeyRepeatState:
+    """repeat settings and timestamps (in nanoseconds) of a single key"""
+
+    __slots__ = (
+        "initial_delay_ns",
+        "rate",
+        "acceleration",
+        "max_rate",
+        "debounce_ns",
+        "last_event_ns",
+        "pressed_ns",
+        "next_repeat_ns",
+    )
+
+    def __init__(self, config: KeyRepeatConfig, default_debounce: float):
+        self.initial_delay_ns = int(config.initial_delay * NS_PER_SECOND)
+        self.rate = config.rate
+        self.acceleration = config.acceleration
+        self.max_rate = config.max_rate
+        debounce = default_debounce if config.debounce is None else config.debounce
+        self.debounce_ns = int(debounce * NS_PER_SECOND)
+        self.last_event_ns = 0
+        self.pressed_ns = 0  # 0 if the last press of the key has been rejected
+        self.next_repeat_ns = 0
+
+
+class KeyRepeatFilter:
+    """
+    Decide which key events from lircd are passed on.
+
+    A new key press is accepted unless it follows an event of the same key within
+    the debounce window. Repeated events of a held key are accepted after the
+    initial delay at the configured rate, which grows by the acceleration for
+    every second the key is held until max_rate is reached.
+    """
+
+    def __init__(self, config: LircConfig):
+        self.default_config = KeyRepeatConfig()
+        self.default_debounce = config.min_delay
+        self.states: dict[str, KeyRepeatState] = {
+            key_name: KeyRepeatState(key_config, config.min_delay)
+            for key_name, key_config in config.repeat.items()
+        }
+
+    def accept(self, key_name: str, repeats: int, now_ns: int) -> bool:
+        state = self.states.get(key_name)
+        if state is None:
+            # created once for every key that has no repeat configuration
+            state = self.states[key_name] = KeyRepeatState(
+                self.default_config, self.default_debounce
+            )
+        last_event_ns = state.last_event_ns
+        state.last_event_ns = now_ns
+
+        if not repeats:
+            if last_event_ns and now_ns - last_event_ns < state.debounce_ns:
+                state.pressed_ns = 0
+                return False
+            state.pressed_ns = now_ns
+            state.next_repeat_ns = now_ns + state.initial_delay_ns
+            return True
+
+        if not state.pressed_ns or not state.rate or now_ns < state.next_repeat_ns:
+            return False
+        held = (now_ns - state.pressed_ns - state.initial_delay_ns) / NS_PER_SECOND
+        rate = min(state.rate + state.acceleration * held, state.max_rate)
+        state.next_repeat_ns = now_ns + int(NS_PER_SECOND / rate)
+        return True
+
+
+# lircd terminates every event with a newline, a longer line is never a valid event
+LIRC_MAX_LINE_LENGTH = 1024
+
 
 class LircProtocol(asyncio.Protocol):
     def __init__(
-        self, config: LircConfig, on_keypress: Callable[[str], Awaitable[None]]
+        self,
+        config: LircConfig,
+        on_keypress: KeypressCallback,
+        repeat_filter: KeyRepeatFilter | None = None,
     ):
         self.on_con_lost = asyncio.get_running_loop().create_future()
-        self.buffer = b""
-        self.last_key = "KEY_COFFEE"
-        self.last_ts = time.monotonic_ns()
-        self.min_delta = config.min_delay * 10e6  # factor needed for nanoseconds
+        self.buffer = bytearray()  # keeps incomplete lines between data_received calls
+        self.repeat_filter = repeat_filter or KeyRepeatFilter(config)
         self.keymap = config.keymap
         self.socket = config.socket
         self.on_keypress = on_keypress
         self.log = create_log_handler("LircProtocol", config.log_level)
-        self._running_tasks: set[asyncio.Task[None]] = set()
+        # counters for parsed, malformed and filtered key events
+        self.events = 0
+        self.malformed = 0
+        self.filtered = 0
 
     def connection_made(self, transport: asyncio.BaseTransport):
         self.log.debug(f"connected to {self.socket=}")
         return super().connection_made(transport)
 
     def data_received(self, data: bytes):
-        for line in data.decode().split("\n"):
-            # TODO: do we need to care about incomplete lines?
-            if not line:  # skip empty lines
-                continue
-            # logging.debug(f"got line from lirc socket: {line}")
-            try:
-                code, repeats, key_name, source = line.split(maxsplit=3)
-            except ValueError as err:
-                self.log.exception(f"could not parse {line=}:\n{err}")
-                return
-            last_timestamp = self.last_ts
-            previous_key = self.last_key
-            current_ts = time.monotonic_ns()
-            self.last_ts = current_ts
-            self.last_key = key_name
-            self.log.debug(
-                f"got key event: {code=}, {repeats=}, {key_name=}, {source=}"
-            )
-            if repeats != "0":
-                self.log.debug(
-                    f"ignoring {repeats} times repeated keypress for {key_name}"
-                )
-                return
-            self.log.debug(
-                f"{abs(current_ts - last_timestamp)=} <  {self.min_delta=} ? {abs(current_ts - last_timestamp) < self.min_delta}"
+        received_ns = time.monotonic_ns()
+        buffer = self.buffer
+        # the remainder of the last call contains no newline, so don't search it again
+        search_start = len(buffer)
+        buffer += data
+        line_start = 0
+        with memoryview(buffer) as view:
+            while (line_end := buffer.find(b"\n", search_start)) != -1:
+                search_start = line_end + 1
+                if line_end > line_start:  # skip empty lines
+                    try:
+                        repeats, key_name, source = self.parse_line(
+                            view, line_start, line_end
+                        )
+                    except ValueError as err:
+                        self.malformed += 1
+                        self.log.error(
+                            "could not parse line %r: %s",
+                            bytes(view[line_start:line_end]),
+                            err,
+                        )
+                    else:
+                        self.on_key_event(repeats, key_name, source, received_ns)
+                line_start = search_start
+        del buffer[:line_start]
+        if len(buffer) > LIRC_MAX_LINE_LENGTH:
+            self.log.error(
+                "discarding %d bytes without a line terminator from lircd", len(buffer)
             )
-            if (
-                self.last_key == previous_key
-                and abs(current_ts - last_timestamp) < self.min_delta
-            ):
-                self.log.debug(f"ignoring keypress within min_delta for {key_name}")
-                return
-            t = asyncio.ensure_future(
-                self.on_keypress(key_name)
-            )  # https://groups.google.com/g/python-tulip/c/z-IVH5RoDzo/m/SpZc0zTuPJsJ
-
-            self._running_tasks.add(t)
-            t.add_done_callback(self._running_tasks.discard)
+            buffer.clear()
+
+    def parse_line(self, view: memoryview, start: int, end: int) -> tuple[int, str, str]:
+        """
+        split a lircd line "<code> <repeat count> <key name> <remote name>" into
+        the repeat count, the key name and the remote name.
+        Only the needed fields are decoded, the code is skipped.
+        """
+        buffer = self.buffer
+        code_end = buffer.find(b" ", start, end)
+        if code_end == -1:
+            raise ValueError("missing repeat count")
+        repeat_end = buffer.find(b" ", code_end + 1, end)
+        if repeat_end == -1:
+            raise ValueError("missing key name")
+        key_end = buffer.find(b" ", repeat_end + 1, end)
+        if key_end == -1 or key_end == repeat_end + 1:
+            raise ValueError("missing remote name")
+        try:
+            repeats = int(str(view[code_end + 1 : repeat_end], "ascii"), 16)
+            key_name = str(view[repeat_end + 1 : key_end], "ascii")
+        except UnicodeDecodeError as err:
+            raise ValueError(err) from err
+        source = str(view[key_end + 1 : end], "utf-8", "replace")
+        return repeats, key_name, source
+
+    def on_key_event(
+        self, repeats: int, key_name: str, source: str, received_ns: int
+    ):
+        self.events += 1
+        self.log.debug(
+            "got key event: repeats=%d, key_name=%s, source=%s",
+            repeats,
+            key_name,
+            source,
+        )
+        if not self.repeat_filter.accept(key_name, repeats, received_ns):
+            self.filtered += 1
+            self.log.debug("ignoring key event %d for %s", repeats, key_name)
+            return
+        # NOTE: on_keypress must not block, it just hands the key to the consumer
+        self.on_keypress(key_name, received_ns)
 
     def error_received(self, exc: Exception):
         self.log.exception(f"Error received: {exc}")
 
     def connection_lost(self, exc: Exception | None):
         self.log.info(f"Connection closed: {exc}")
-        self.on_con_lost.set_result(True)
-        raise ConnectionAbortedError("lircd socket vanished")
+        if not self.on_con_lost.done():
+            self.on_con_lost.set_result(True)
 
 
-async def handle_lirc_connection(
-    on_keypress: Callable[[str], Awaitable[None]], config: Config
-) -> NoReturn:
-    LircProtocolWithArgs = partial(
-        LircProtocol,
-        config=config.lirc,
-        on_keypress=on_keypress,
-    )
-    loop = asyncio.get_running_loop()
-    while True:
+class LircConnectionState(enum.StrEnum):
+    DISCONNECTED = "disconnected"
+    CONNECTING = "connecting"
+    CONNECTED = "connected"
+
+
+# delay (in seconds) between connection attempts if the socket doesn't appear
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 60.0
+
+
+class LircConnection:
+    """
+    Keep a connection to the lircd socket.
+
+    If lircd is not available, the parent directory of the socket is watched with
+    inotify, so we connect as soon as the socket is created. Connection attempts
+    without an event are retried with an exponential backoff and some jitter.
+    """
+
+    def __init__(self, on_keypress: KeypressCallback, config: LircConfig):
+        self.config = config
+        self.socket = config.socket
+        self.protocol_factory = partial(
+            LircProtocol,
+            config=config,
+            on_keypress=on_keypress,
+            repeat_filter=KeyRepeatFilter(config),  # keep the key states on reconnect
+        )
+        self.log = create_log_handler("LircConnection", config.log_level)
+        self.state = LircConnectionState.DISCONNECTED
+        self.reconnect_count = 0
+        self.socket_changed = asyncio.Event()
+        self.inotify: Inotify | None = None
+        self.watch_descriptor: int | None = None
+        self.protocol: LircProtocol | None = None
+
+    def on_inotify_event(self, event: InotifyEvent) -> None:
+        if event.mask & IN_IGNORED:  # the directory has been removed
+            self.watch_descriptor = None
+            self.socket_changed.set()
+        elif event.name == self.socket.name:
+            self.socket_changed.set()
+
+    def watch_socket_directory(self) -> None:
+        if self.watch_descriptor is not None:
+            return
         try:
-            _transport, protocol = await loop.create_unix_connection(
-                LircProtocolWithArgs,
-                config.lirc.socket.__str__(),
-            )
-            await protocol.on_con_lost
-        except (ConnectionAbortedError, IOError) as err:
-            logging.debug(
-                f"{__name__}: could not establish connection to lircd socket: {err}"
+            if self.inotify is None:
+                self.inotify = Inotify(self.on_inotify_event)
+            self.watch_descriptor = self.inotify.add_watch(
+                self.socket.parent, IN_CREATE | IN_MOVED_TO | IN_ATTRIB | IN_ONLYDIR
             )
-            await asyncio.sleep(1)
+        except OSError as err:
+            self.log.debug(f"can't watch {self.socket.parent}: {err}")
+
+    async def run(self) -> NoReturn:
+        loop = asyncio.get_running_loop()
+        delay = RECONNECT_MIN_DELAY
+        was_connected = False
+        is_waiting = False  # avoid logging every failed connection attempt
+        try:
+            while True:
+                self.state = LircConnectionState.CONNECTING
+                self.socket_changed.clear()
+                try:
+                    _transport, protocol = await loop.create_unix_connection(
+                        self.protocol_factory, str(self.socket)
+                    )
+                except OSError as err:
+                    if not is_waiting:
+                        self.log.info(f"waiting for lircd socket {self.socket}: {err}")
+                        is_waiting = True
+                    self.state = LircConnectionState.DISCONNECTED
+                    self.watch_socket_directory()
+                    try:
+                        await asyncio.wait_for(
+                            self.socket_changed.wait(),
+                            timeout=delay * random.uniform(0.5, 1.5),
+                        )
+                    except TimeoutError:
+                        delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                    continue
+
+                self.protocol = protocol
+                self.state = LircConnectionState.CONNECTED
+                is_waiting = False
+                if was_connected:
+                    self.reconnect_count += 1
+                was_connected = True
+                delay = RECONNECT_MIN_DELAY
+                await protocol.on_con_lost
+                self.state = LircConnectionState.DISCONNECTED
+        finally:
+            self.state = LircConnectionState.DISCONNECTED
+            if self.inotify is not None:
+                self.inotify.close()
+
+
+async def handle_lirc_connection(
+    on_keypress: KeypressCallback, config: Config
+) -> NoReturn:
+    await LircConnection(on_keypress, config.lirc).run()
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
     config = load_yaml()
 
-    async def on_key_callback(cmd: str):
+    def on_key_callback(cmd: str, received_ns: int):
         print(f"pressed {cmd}")
 
     asyncio.run(handle_lirc_connection(on_key_callback, config))
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# Record the stream of a lircd socket and replay it to benchmark the LIRC input path
+# (parser, repeat filter and key action queue) without a real IR receiver.
+#
+# usage:
+#   python -m yavdr_frontend.lirc_replay record /tmp/remote.lircrec
+#   python -m yavdr_frontend.lirc_replay generate /tmp/burst.lircrec --presses 2000
+#   python -m yavdr_frontend.lirc_replay replay /tmp/remote.lircrec --socket /tmp/lircd
+#   python -m yavdr_frontend.lirc_replay bench /tmp/burst.lircrec --speed 0
+import asyncio
+import logging
+import statistics
+import struct
+import tempfile
+import time
+from argparse import ArgumentParser
+from collections.abc import Sequence
+from pathlib import Path
+from typing import NamedTuple
+
+from ruamel.yaml import YAML
+
+from yavdr_frontend.config import LircConfig, LoggingEnum
+from yavdr_frontend.keymap import KeyActionQueue, compile_keymap
+from yavdr_frontend.lirc import LircConnection
+
+# file format: the header followed by a record for every chunk read from the socket
+RECORDING_HEADER = b"LIRCREC\x01"
+RECORD = struct.Struct("<IH")  # delay to the previous chunk in µs, chunk length
+MAX_DELAY_US = 2**32 - 1
+MAX_CHUNK_SIZE = 2**16 - 1
+
+log = logging.getLogger("lirc_replay")
+
+
+class Chunk(NamedTuple):
+    delay_us: int
+    data: bytes
+
+
+class BenchResult(NamedTuple):
+    duration: float
+    events: int
+    malformed: int
+    filtered: int
+    queued: int
+    dropped: int
+    coalesced: int
+    dispatch_latencies_ns: list[int]
+
+
+def write_recording(path: Path, chunks: Sequence[Chunk]) -> None:
+    with path.open("wb") as f:
+        f.write(RECORDING_HEADER)
+        for chunk in chunks:
+            f.write(RECORD.pack(chunk.delay_us, len(chunk.data)))
+            f.write(chunk.data)
+
+
+def load_recording(path: Path) -> list[Chunk]:
+    data = path.read_bytes()
+    if not data.startswith(RECORDING_HEADER):
+        raise ValueError(f"{path} is not a lircd recording")
+    chunks: list[Chunk] = []
+    offset = len(RECORDING_HEADER)
+    while offset < len(data):
+        delay_us, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        chunks.append(Chunk(delay_us, data[offset : offset + length]))
+        offset += length
+    return chunks
+
+
+async def record(socket: Path, path: Path, duration: float | None) -> int:
+    """record the data sent by lircd until the connection is closed or the duration has passed"""
+    reader, writer = await asyncio.open_unix_connection(str(socket))
+    chunks: list[Chunk] = []
+    last_ns = time.monotonic_ns()
+    try:
+        async with asyncio.timeout(duration):
+            while data := await reader.read(MAX_CHUNK_SIZE):
+                now_ns = time.monotonic_ns()
+                delay_us = min((now_ns - last_ns) // 1000, MAX_DELAY_US)
+                chunks.append(Chunk(delay_us, data))
+                last_ns = now_ns
+    except (TimeoutError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+        write_recording(path, chunks)
+    return len(chunks)
+
+
+def generate(
+    path: Path,
+    presses: int,
+    repeats: int,
+    interval: float,
+    keys: Sequence[str],
+    chunk_size: int,
+) -> int:
+    """
+    write a synthetic recording with key presses and repeated events of the given keys,
+    lines are split at chunk_size bytes to exercise the line framing
+    """
+    delay_us = int(interval * 1_000_000)
+    chunks: list[Chunk] = []
+    for press in range(presses):
+        key = keys[press % len(keys)]
+        for repeat in range(repeats + 1):
+            line = f"{press:016x} {repeat:02x} {key} synthetic\n".encode()
+            for start in range(0, len(line), chunk_size):
+                chunks.append(
+                    Chunk(delay_us if start == 0 else 0, line[start : start + chunk_size])
+                )
+    write_recording(path, chunks)
+    return presses * (repeats + 1)
+
+
+async def serve_recording(
+    chunks: Sequence[Chunk],
+    speed: float,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    """send the recorded chunks, speed 0 sends them without any delay"""
+    try:
+        for chunk in chunks:
+            if speed > 0 and chunk.delay_us:
+                await asyncio.sleep(chunk.delay_us / 1_000_000 / speed)
+            writer.write(chunk.data)
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def replay(chunks: Sequence[Chunk], socket: Path, speed: float) -> None:
+    """serve the recording on a unix socket for every client that connects"""
+
+    async def on_connect(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        log.info("client connected, replaying %d chunks", len(chunks))
+        await serve_recording(chunks, speed, reader, writer)
+        log.info("replay finished")
+
+    server = await asyncio.start_unix_server(on_connect, str(socket))
+    async with server:
+        await server.serve_forever()
+
+
+class StubController:
+    """accepts every action of a keymap and just waits for action_time seconds"""
+
+    def __init__(self, action_time: float):
+        self.action_time = action_time
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._action
+
+    async def _action(self, *args: str) -> None:
+        await asyncio.sleep(self.action_time)
+
+
+async def bench(
+    chunks: Sequence[Chunk],
+    config: LircConfig,
+    speed: float,
+    action_time: float,
+) -> BenchResult:
+    """
+    replay the recording through LircConnection and a KeyActionQueue,
+    the dispatch latency is measured from the reception of a key event until
+    the queue starts its action
+    """
+    dispatch_latencies_ns: list[int] = []
+    stub = StubController(action_time)
+    bindings = compile_keymap(stub, config.keymap, log)
+
+    async def on_keypress(key_name: str, received_ns: int) -> None:
+        dispatch_latencies_ns.append(time.monotonic_ns() - received_ns)
+        if binding := bindings.get(key_name):
+            await binding.call()
+        else:
+            await stub._action()
+
+    queue = KeyActionQueue(on_keypress, bindings.get, config.queue_size, log)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket = Path(tmpdir) / "lircd"
+        config = config.model_copy(update={"socket": socket})
+        served = asyncio.Event()
+
+        async def on_connect(
+            reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        ) -> None:
+            await serve_recording(chunks, speed, reader, writer)
+            served.set()
+
+        server = await asyncio.start_unix_server(on_connect, str(socket))
+        connection = LircConnection(queue.submit, config)
+        async with server, asyncio.TaskGroup() as tg:
+            consumer = tg.create_task(queue.run())
+            client = tg.create_task(connection.run())
+            start = time.perf_counter()
+            await served.wait()
+            server.close()  # the recording is replayed only once
+            if connection.protocol is not None:
+                await connection.protocol.on_con_lost
+            duration = time.perf_counter() - start
+            while queue.is_busy():
+                await asyncio.sleep(0.001)
+            client.cancel()
+            consumer.cancel()
+
+    protocol = connection.protocol
+    return BenchResult(
+        duration=duration,
+        events=protocol.events if protocol else 0,
+        malformed=protocol.malformed if protocol else 0,
+        filtered=protocol.filtered if protocol else 0,
+        queued=queue.processed,
+        dropped=queue.dropped,
+        coalesced=queue.coalesced,
+        dispatch_latencies_ns=dispatch_latencies_ns,
+    )
+
+
+def percentile(values: Sequence[int], pct: float) -> float:
+    if len(values) < 2:
+        return float(values[0]) if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+def print_bench_result(result: BenchResult) -> None:
+    latencies = result.dispatch_latencies_ns
+    print(f"duration:          {result.duration:.3f} s")
+    print(f"parsed events:     {result.events}")
+    print(f"events/s parsed:   {result.events / result.duration:.0f}")
+    print(f"malformed lines:   {result.malformed}")
+    print(f"filtered repeats:  {result.filtered}")
+    print(f"dispatched keys:   {result.queued}")
+    print(f"dropped keys:      {result.dropped}")
+    print(f"coalesced keys:    {result.coalesced}")
+    print(f"dispatch p50:      {percentile(latencies, 50) / 1e6:.3f} ms")
+    print(f"dispatch p99:      {percentile(latencies, 99) / 1e6:.3f} ms")
+
+
+def load_lirc_config(path: Path | None) -> LircConfig:
+    if path is None:
+        return LircConfig(socket=Path("lircd"), keymap={})
+    data = YAML(typ="safe").load(path)
+    return LircConfig.model_validate(data["lirc"])
+
+
+def main():
+    parser = ArgumentParser(description="record and replay lircd socket streams")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="record a lircd socket")
+    record_parser.add_argument("recording", type=Path)
+    record_parser.add_argument("--socket", type=Path, default=Path("/run/lirc/lircd"))
+    record_parser.add_argument(
+        "--duration", type=float, default=None, help="stop after n seconds"
+    )
+
+    generate_parser = subparsers.add_parser(
+        "generate", help="write a synthetic recording"
+    )
+    generate_parser.add_argument("recording", type=Path)
+    generate_parser.add_argument("--presses", type=int, default=1000)
+    generate_parser.add_argument(
+        "--repeats", type=int, default=5, help="repeated events per key press"
+    )
+    generate_parser.add_argument(
+        "--interval", type=float, default=0.11, help="seconds between key events"
+    )
+    generate_parser.add_argument(
+        "--keys", nargs="+", default=["KEY_VOLUMEUP", "KEY_OK", "KEY_PROG1"]
+    )
+    generate_parser.add_argument(
+        "--chunk-size", type=int, default=24, help="split the stream into chunks"
+    )
+
+    replay_parser = subparsers.add_parser(
+        "replay", help="serve a recording on a unix socket"
+    )
+    replay_parser.add_argument("recording", type=Path)
+    replay_parser.add_argument("--socket", type=Path, required=True)
+    replay_parser.add_argument(
+        "--speed", type=float, default=1.0, help="replay speed, 0 disables delays"
+    )
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="replay a recording through the LIRC input path"
+    )
+    bench_parser.add_argument("recording", type=Path)
+    bench_parser.add_argument(
+        "--speed", type=float, default=0.0, help="replay speed, 0 disables delays"
+    )
+    bench_parser.add_argument(
+        "--config", type=Path, default=None, help="use the lirc section of this config"
+    )
+    bench_parser.add_argument(
+        "--action-time", type=float, default=0.0, help="duration of each key action"
+    )
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    match args.command:
+        case "record":
+            n = asyncio.run(record(args.socket, args.recording, args.duration))
+            print(f"recorded {n} chunks to {args.recording}")
+        case "generate":
+            n = generate(
+                args.recording,
+                args.presses,
+                args.repeats,
+                args.interval,
+                args.keys,
+                args.chunk_size,
+            )
+            print(f"wrote {n} key events to {args.recording}")
+        case "replay":
+            try:
+                asyncio.run(
+                    replay(load_recording(args.recording), args.socket, args.speed)
+                )
+            except KeyboardInterrupt:
+                pass
+        case "bench":
+            config = load_lirc_config(args.config).model_copy(
+                update={"log_level": LoggingEnum.WARNING}
+            )
+            result = asyncio.run(
+                bench(
+                    load_recording(args.recording),
+                    config,
+                    args.speed,
+                    args.action_time,
+                )
+            )
+            print_bench_result(result)
+
+
+if __name__ == "__main__":
+    main()
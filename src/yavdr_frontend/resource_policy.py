@@ -0,0 +1,110 @@
+import asyncio
+from collections.abc import Callable
+
+from yavdr_frontend.config import ResourceProfile, ResourceRoleEnum
+from yavdr_frontend.interfaces.systemd_dbus_interface import SYSTEMD_DBUS_INTERFACE
+from yavdr_frontend.interfaces.systemd_unit_interface import (
+    OrgFreedesktopSystemd1ServiceInterface,
+)
+from yavdr_frontend.loghandler import create_log_handler
+from yavdr_frontend.systemdfrontend import SystemdUnitFrontend
+
+FrontendRoles = list[tuple[SystemdUnitFrontend, ResourceRoleEnum]]
+DEFAULT_PROFILE = ResourceProfile()
+
+
+class ResourcePolicy:
+    """
+    Apply the CPU and IO weights of the configured profile for the role of each
+    running unit frontend (the active frontend, the one to switch to and the
+    others in the background).
+
+    The weights are set as runtime properties, so they are reset when the unit is
+    restarted. Updates requested while they are being applied are merged, units
+    are only changed if their role changed since the last update or if they have
+    been restarted since (the InvocationID of the unit changed).
+    """
+
+    def __init__(
+        self,
+        profiles: dict[ResourceRoleEnum, ResourceProfile],
+        get_roles: Callable[[], FrontendRoles],
+    ):
+        self.log = create_log_handler("ResourcePolicy")
+        self.profiles = profiles
+        self.get_roles = get_roles
+        # unit name -> the InvocationID of the unit and the profile which has been
+        # applied to this run of the unit
+        self.applied: dict[str, tuple[bytes, ResourceProfile]] = {}
+        self.task: asyncio.Task[None] | None = None
+        self.dirty = False
+
+    def schedule(self) -> None:
+        """update the weights of the units without blocking the caller"""
+        if not self.profiles:
+            return
+        self.dirty = True
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self.dirty:
+            self.dirty = False
+            for frontend, role in self.get_roles():
+                try:
+                    await self.apply(frontend, role)
+                except Exception as e:
+                    self.log.error(f"could not set the weights of {frontend.name}: {e}")
+
+    async def apply(
+        self, frontend: SystemdUnitFrontend, role: ResourceRoleEnum
+    ) -> None:
+        unit_name = frontend.unit_name
+        if not await frontend.unit.is_running():
+            # the runtime properties are lost when the unit stops
+            self.applied.pop(unit_name, None)
+            return
+        # roles without a profile get the defaults of systemd
+        profile = self.profiles.get(role, DEFAULT_PROFILE)
+        invocation_id = frontend.unit.invocation_id()
+        # a restarted unit has lost the weights which have been applied before
+        applied_id, applied = self.applied.get(
+            unit_name, (invocation_id, DEFAULT_PROFILE)
+        )
+        if applied_id == invocation_id and applied == profile:
+            return
+        await frontend.systemd_manager_proxy.set_unit_properties(
+            unit_name,
+            True,
+            [
+                ("CPUWeight", ("t", profile.cpu_weight)),
+                ("IOWeight", ("t", profile.io_weight)),
+            ],
+        )
+        self.applied[unit_name] = (invocation_id, profile)
+        await self.verify(frontend, role, profile)
+
+    async def verify(
+        self,
+        frontend: SystemdUnitFrontend,
+        role: ResourceRoleEnum,
+        profile: ResourceProfile,
+    ) -> None:
+        service = OrgFreedesktopSystemd1ServiceInterface.new_proxy(
+            SYSTEMD_DBUS_INTERFACE,
+            frontend.unit.unit_object_path,
+            bus=frontend.systemd_bus,
+        )
+        cpu_weight = await service.cpuweight
+        io_weight = await service.ioweight
+        if (cpu_weight, io_weight) != (profile.cpu_weight, profile.io_weight):
+            self.log.warning(
+                f"{frontend.unit_name} ({role}) has CPUWeight={cpu_weight}, "
+                f"IOWeight={io_weight} instead of {profile}"
+            )
+            self.applied.pop(frontend.unit_name, None)
+        else:
+            self.log.info(
+                f"{frontend.unit_name} ({role}): CPUWeight={cpu_weight}, "
+                f"IOWeight={io_weight}"
+            )
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 import asyncio
+from pathlib import Path
+
 import sdbus
 
 from yavdr_frontend.args import StartArgumentParser
 from yavdr_frontend.config import load_yaml
+from yavdr_frontend.desktop_entries import desktop_entries
 from yavdr_frontend.tools import get_bus
 from yavdr_frontend.interfaces.yavdr_frontend_interface import (
     yaVDRFrontendInterface,
@@ -20,7 +23,22 @@ from yavdr_frontend.interfaces.yavdr_frontend_interface import (
 # Slashes of the paths in the subfolders are replaced by dashes - e.g. `/usr/share/applications/foo/bar.desktop` has the id `foo-bar.desktop`
 
 
+def resolve_desktop_id(desktop_entry: str) -> str:
+    # forward the desktop_id of .desktop files, so all spellings of an entry
+    # refer to the same frontend. Other names might be configured applications.
+    if not desktop_entry.endswith(".desktop"):
+        return desktop_entry
+    if (p := Path(desktop_entry)).is_absolute():
+        path: Path | None = p
+    else:
+        path = desktop_entries.lookup(desktop_entry)
+    if path is not None and (desktop_id := desktop_entries.desktop_id(path)):
+        return desktop_id
+    return desktop_entry
+
+
 async def start_desktop(desktop_entry: str, args: list[str], bus: sdbus.SdBus) -> None:
+    desktop_entry = resolve_desktop_id(desktop_entry)
     fe = yaVDRFrontendInterface.new_proxy(
         YAVDR_FRONTEND_BUS_NAME, "/Controller", bus=bus
     )
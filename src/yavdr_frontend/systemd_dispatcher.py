@@ -0,0 +1,149 @@
+import asyncio
+from collections import OrderedDict
+from typing import NamedTuple
+
+from sdbus import SdBus
+
+from yavdr_frontend.interfaces.systemd_dbus_interface import (
+    OrgFreedesktopSystemd1ManagerInterface,
+    create_systemd_manager_proxy,
+)
+from yavdr_frontend.loghandler import create_log_handler
+
+# results of finished jobs are kept for waiters which register after the
+# JobRemoved signal arrived (e.g. if the job finished before StartUnit returned)
+RECENT_JOBS_SIZE = 64
+
+
+class JobResult(NamedTuple):
+    job_path: str
+    # the result of the JobRemoved signal, "timeout" if the job was cancelled
+    # because it didn't finish in time
+    result: str
+    duration: float  # seconds from the creation of the job until it ended
+    polled: bool  # the result was determined by polling instead of the signal
+    cancelled: bool  # the job was cancelled by us after the deadline
+
+    @property
+    def success(self) -> bool:
+        return self.result == "done"
+
+
+def job_id(job_path: str) -> int:
+    """return the id of a job from its object path"""
+    return int(job_path.rpartition("/")[2])
+
+
+class SystemdSignalDispatcher:
+    """
+    Route the JobRemoved and UnitRemoved signals of a systemd manager to waiters.
+
+    The signals are received once per bus and looked up by the job path or the
+    unit object path, so the cost per signal doesn't depend on the number of
+    frontends. Waiters are removed when they got their result, timed out or were
+    cancelled.
+    """
+
+    def __init__(self, systemd_manager: OrgFreedesktopSystemd1ManagerInterface):
+        self.log = create_log_handler("SystemdSignalDispatcher")
+        self.systemd_manager = systemd_manager
+        # job path -> futures for the job result
+        self.jobs: dict[str, list[asyncio.Future[str]]] = {}
+        # job path -> result of recently removed jobs
+        self.recent_jobs: OrderedDict[str, str] = OrderedDict()
+        # unit object path -> futures for the unit name
+        self.units: dict[str, list[asyncio.Future[str]]] = {}
+        self._watchers: list[asyncio.Task[None]] = []
+
+    def watch(self) -> None:
+        """subscribe to the signals, must be called from the event loop"""
+        if not self._watchers:
+            self._watchers = [
+                asyncio.create_task(self._subscribe()),
+                asyncio.create_task(self._dispatch_job_removed()),
+                asyncio.create_task(self._dispatch_unit_removed()),
+            ]
+
+    async def _subscribe(self) -> None:
+        # systemd only emits the job and unit signals (incl. PropertiesChanged of
+        # the units) if a client is subscribed
+        try:
+            await self.systemd_manager.subscribe()
+        except Exception as e:
+            self.log.warning(f"could not subscribe to the systemd manager: {e}")
+
+    async def wait_job(self, job_path: str, timeout: float | None = None) -> str:
+        """
+        wait until the job was removed and return its result
+        ("done", "canceled", "timeout", "failed", "dependency" or "skipped"),
+        raises TimeoutError if it didn't finish within timeout seconds
+        """
+        self.watch()
+        if (result := self.recent_jobs.get(job_path)) is not None:
+            return result
+        return await self._wait(self.jobs, job_path, timeout)
+
+    async def wait_unit_removed(
+        self, unit_path: str, timeout: float | None = None
+    ) -> str:
+        """wait for the next UnitRemoved signal of the unit and return the unit name"""
+        self.watch()
+        return await self._wait(self.units, unit_path, timeout)
+
+    async def _wait(
+        self,
+        waiters: dict[str, list[asyncio.Future[str]]],
+        key: str,
+        timeout: float | None,
+    ) -> str:
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        waiters.setdefault(key, []).append(future)
+        try:
+            async with asyncio.timeout(timeout):
+                return await future
+        finally:
+            if (futures := waiters.get(key)) is not None:
+                if future in futures:
+                    futures.remove(future)
+                if not futures:
+                    del waiters[key]
+
+    @staticmethod
+    def _resolve(
+        waiters: dict[str, list[asyncio.Future[str]]], key: str, value: str
+    ) -> None:
+        for future in waiters.pop(key, ()):
+            if not future.done():
+                future.set_result(value)
+
+    async def _dispatch_job_removed(self) -> None:
+        async for (
+            job_id,
+            job_path,
+            unit_name,
+            result,
+        ) in self.systemd_manager.job_removed:
+            self.recent_jobs[job_path] = result
+            if len(self.recent_jobs) > RECENT_JOBS_SIZE:
+                self.recent_jobs.popitem(last=False)
+            if job_path in self.jobs:
+                self.log.debug(f"job {job_path} ({job_id}) for {unit_name}: {result}")
+                self._resolve(self.jobs, job_path, result)
+
+    async def _dispatch_unit_removed(self) -> None:
+        async for unit_name, unit_path in self.systemd_manager.unit_removed:
+            if unit_path in self.units:
+                self._resolve(self.units, unit_path, unit_name)
+
+
+_dispatchers: dict[int, SystemdSignalDispatcher] = {}
+
+
+def get_systemd_dispatcher(bus: SdBus) -> SystemdSignalDispatcher:
+    """return the shared dispatcher for the systemd manager on bus"""
+    # NOTE: the buses are module level singletons, so their id stays valid
+    if (dispatcher := _dispatchers.get(id(bus))) is None:
+        dispatcher = _dispatchers[id(bus)] = SystemdSignalDispatcher(
+            create_systemd_manager_proxy(bus=bus)
+        )
+    return dispatcher
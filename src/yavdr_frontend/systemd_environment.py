@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from collections.abc import Generator, Mapping
+from types import MappingProxyType
+from typing import Any, Self
+
+from yavdr_frontend.interfaces.systemd_dbus_interface import (
+    OrgFreedesktopSystemd1ManagerInterface,
+)
+
+
+def parse_environment(assignments: list[str]) -> dict[str, str]:
+    """convert a list of VAR=value assignments to a dict"""
+    env: dict[str, str] = {}
+    for assignment in assignments:
+        key, sep, value = assignment.partition("=")
+        if sep:
+            env[key] = value
+    return env
+
+
+class SystemdEnvironment:
+    """
+    Cache of the environment of the systemd manager.
+
+    The environment is loaded once and updated after a daemon-reload and after our
+    own set_environment calls. systemd doesn't emit PropertiesChanged for the
+    Environment property, so changes by other clients (e.g. the DISPLAY imported
+    by the Xorg session) are only seen after refresh() was called.
+    Readers get a read-only snapshot, which doesn't change after it was returned.
+    """
+
+    def __init__(
+        self,
+        systemd_manager: OrgFreedesktopSystemd1ManagerInterface,
+        log: logging.Logger,
+    ):
+        self.systemd_manager = systemd_manager
+        self.log = log
+        self._snapshot: Mapping[str, str] = MappingProxyType({})
+        self._watchers: list[asyncio.Task[None]] = []
+
+    async def __async_init__(self) -> Self:
+        await self.refresh()
+        self._watchers = [asyncio.create_task(self.watch_reloading())]
+        return self
+
+    def __await__(self) -> Generator[Any, None, Self]:
+        return self.__async_init__().__await__()
+
+    def snapshot(self) -> Mapping[str, str]:
+        return self._snapshot
+
+    def get(self, key: str, default: str | None = None) -> str | None:
+        return self._snapshot.get(key, default)
+
+    def _replace(self, env: dict[str, str]) -> None:
+        # NOTE: the dict is never modified after this, so snapshots stay consistent
+        self._snapshot = MappingProxyType(env)
+
+    async def refresh(self) -> Mapping[str, str]:
+        """reload the environment from the systemd manager"""
+        self._replace(parse_environment(await self.systemd_manager.environment))
+        self.log.debug("loaded the systemd environment: %s", dict(self._snapshot))
+        return self._snapshot
+
+    async def update(self, env: Mapping[str, str]) -> None:
+        """set the given variables in the environment of the systemd manager"""
+        await self.systemd_manager.set_environment(
+            [f"{key}={value}" for key, value in env.items()]
+        )
+        self._replace({**self._snapshot, **env})
+
+    async def unset(self, names: list[str]) -> None:
+        """remove the given variables from the environment of the systemd manager"""
+        await self.systemd_manager.unset_environment(names)
+        self._replace({k: v for k, v in self._snapshot.items() if k not in names})
+
+    async def watch_reloading(self) -> None:
+        async for active in self.systemd_manager.reloading:
+            if not active:  # the reload has finished
+                await self.refresh()
@@ -1,13 +1,15 @@
 import asyncio
-from collections.abc import Generator
+import time
+from collections.abc import Collection, Generator
 from typing import Any, Protocol, Self, TYPE_CHECKING
 from sdbus import SdBus
 
 from yavdr_frontend.config import (
     LoggingEnum,
+    SuspendModeEnum,
     UnitFrontendConfig,
 )
-from yavdr_frontend.basicfrontend import FrontendProtocol
+from yavdr_frontend.basicfrontend import FrontendProtocol, FrontendState
 
 if TYPE_CHECKING:
     from yavdr_frontend.controller import Controller
@@ -18,6 +20,7 @@ from yavdr_frontend.protocols.frontend_protocols import (
 )
 from yavdr_frontend.tools import get_bus, pwresume, pwsuspend
 from yavdr_frontend.interfaces.systemd_unit_interface import (
+    OrgFreedesktopSystemd1ServiceInterface,
     OrgFreedesktopSystemd1UnitInterface,
 )
 from yavdr_frontend.interfaces.systemd_dbus_interface import (
@@ -25,6 +28,17 @@ from yavdr_frontend.interfaces.systemd_dbus_interface import (
     create_systemd_manager_proxy,
     SYSTEMD_DBUS_INTERFACE,
 )
+from yavdr_frontend.systemd_dispatcher import JobResult, get_systemd_dispatcher, job_id
+from yavdr_frontend.unit_properties import UnitPropertyCache
+
+# max. time (in seconds) to wait for the state change of a unit after its job ended
+UNIT_STATE_TIMEOUT = 2.0
+# if the JobRemoved signal doesn't arrive, the job is polled after this time (in
+# seconds), the interval is doubled up to JOB_POLL_MAX_INTERVAL
+JOB_POLL_INTERVAL = 1.0
+JOB_POLL_MAX_INTERVAL = 8.0
+# the unit is still changing its state, so a job might be running
+TRANSITIONAL_STATES = ("activating", "deactivating", "reloading", "refreshing")
 
 # basic idea:
 # ehen starting a unit, systemd uses a job to keep track of the start process
@@ -40,18 +54,28 @@ class SystemdUnit:
         unit_name: str,
         systemd_dbus: SdBus,
         frontend: "SystemdUnitFrontend",
+        start_timeout: float | None = None,
+        stop_timeout: float | None = None,
     ):
         self.log = create_log_handler(f"SystemdUnit<{unit_name}>", LoggingEnum.DEBUG)
         self.unit_name = unit_name
+        self.start_timeout = start_timeout
+        self.stop_timeout = stop_timeout
         self.systemd_dbus = systemd_dbus
         self.systemd_manager_proxy = create_systemd_manager_proxy(
             bus=self.systemd_dbus,
         )
         self.frontend = frontend
+        self.dispatcher = get_systemd_dispatcher(self.systemd_dbus)
         self.unit_stop_tracker: None | asyncio.Task[None] = None
+        # results of the last job, the last start job and how the unit ended
+        self.last_job_result = ""
+        self.start_result = ""
+        self.exit_result = ""
 
     async def __async_init__(self) -> Self:
         # await self.systemd_manager_proxy.subscribe()
+        self.dispatcher.watch()
         self.unit_object_path = await self.systemd_manager_proxy.load_unit(
             self.unit_name
         )
@@ -59,7 +83,10 @@ class SystemdUnit:
             SYSTEMD_DBUS_INTERFACE, self.unit_object_path, bus=self.systemd_dbus
         )
         # INFO: we need to call the Subscribe() method for the org.freedesktop.systemd1.Manager interface on the /org/freedesktop/systemd1 object once.
-        # this happens in the SystemdUnitFrontend class, so we don't have to do it here
+        # this happens in the SystemdSignalDispatcher, so we don't have to do it here
+        self.properties = await UnitPropertyCache(
+            self.unit_proxy, self.log, self.systemd_dbus, self.unit_object_path
+        )
         self._is_running: bool = await self.get_status()
         return self
 
@@ -68,48 +95,162 @@ class SystemdUnit:
             self.__async_init__().__await__()
         )  # see https://stackoverflow.com/a/58976768
 
-    async def track_job(self, current_job_path: str):
-        async for (
-            job_id,
-            job_path,
-            unit_name,
-            result,
-        ) in self.systemd_manager_proxy.job_removed:
-            if current_job_path == job_path:
-                self.log.debug(f"job {job_path} ended: {result}")
-                if result != "done":
-                    self.log.error(
-                        f"job {job_path} with id: {job_id} for {unit_name} ended: {result}"
-                    )
-                else:
-                    if self.unit_stop_tracker is None:
-                        print(f"adding tracker for {self.unit_name}")
-                        self.unit_stop_tracker = asyncio.create_task(
-                            self.on_unit_removed()
-                        )
-                return result == "done"  # only in this case the job was successful
+    def close(self) -> None:
+        """cancel the tracking of the unit, it can't be used afterwards"""
+        if self.unit_stop_tracker is not None:
+            self.unit_stop_tracker.cancel()
+            self.unit_stop_tracker = None
+        self.properties.close()
 
-    async def start(self):
-        current_job_path = await self.systemd_manager_proxy.start_unit(
-            self.unit_name, "replace"
+    async def track_job(
+        self,
+        current_job_path: str,
+        timeout: float | None = None,
+        done_states: Collection[str] = ("active",),
+        started: float | None = None,
+    ) -> JobResult:
+        """
+        wait until the job ended, at most timeout seconds. If the JobRemoved
+        signal doesn't arrive, the result is derived from the ActiveState of the
+        unit (done if it is one of done_states) once the job is gone.
+        """
+        if started is None:
+            started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        interval = JOB_POLL_INTERVAL
+        polled = cancelled = False
+        while True:
+            wait = interval
+            if deadline is not None:
+                if (remaining := deadline - time.monotonic()) <= 0:
+                    await self.cancel_job(current_job_path)
+                    result, cancelled = "timeout", True
+                    break
+                wait = min(interval, remaining)
+            try:
+                result = await self.dispatcher.wait_job(current_job_path, wait)
+                break
+            except TimeoutError:
+                pass
+            result = await self.poll_job(current_job_path, done_states)
+            if result is not None:
+                polled = True
+                break
+            interval = min(interval * 2, JOB_POLL_MAX_INTERVAL)
+
+        job = JobResult(
+            current_job_path, result, time.monotonic() - started, polled, cancelled
         )
-        return await self.track_job(current_job_path=current_job_path)
+        self.last_job_result = result
+        self.log.debug(f"job {current_job_path} ended: {job}")
+        if not job.success:
+            self.log.error(
+                f"job {current_job_path} for {self.unit_name} ended: {result}"
+            )
+        elif self.unit_stop_tracker is None:
+            self.log.debug(f"adding tracker for {self.unit_name}")
+            self.unit_stop_tracker = asyncio.create_task(self.on_unit_removed())
+        return job
 
-    async def stop(self):
+    async def poll_job(
+        self, job_path: str, done_states: Collection[str]
+    ) -> str | None:
+        """return the result of a job which is gone, None if it is still running"""
+        try:
+            await self.systemd_manager_proxy.get_job(job_id(job_path))
+            return None
+        except Exception:
+            pass  # NoSuchJob, the JobRemoved signal was missed
+        if (result := self.dispatcher.recent_jobs.get(job_path)) is not None:
+            return result
+        try:
+            await self.properties.refresh()
+        except Exception as e:
+            self.log.warning(f"could not poll the state of {self.unit_name}: {e}")
+            return None
+        if (state := self.properties.active_state) in TRANSITIONAL_STATES:
+            return None
+        self.log.warning(f"missed the end of job {job_path}, unit is {state}")
+        return "done" if state in done_states else "failed"
+
+    async def cancel_job(self, job_path: str) -> None:
+        self.log.error(f"job {job_path} for {self.unit_name} timed out, cancelling")
+        try:
+            await self.systemd_manager_proxy.cancel_job(job_id(job_path))
+        except Exception as e:
+            self.log.debug(f"could not cancel {job_path}: {e}")
+
+    async def wait_for_state(self, active_states: Collection[str]) -> bool:
+        # the PropertiesChanged signal might arrive after the JobRemoved signal
+        if await self.properties.wait_for_state(active_states, UNIT_STATE_TIMEOUT):
+            return True
+        await self.properties.refresh()
+        return self.properties.active_state in active_states
+
+    async def submit_start_job(self) -> str:
+        """ask systemd to start the unit and return the path of the job"""
+        return await self.systemd_manager_proxy.start_unit(self.unit_name, "replace")
+
+    async def start(self) -> JobResult:
+        started = time.monotonic()
+        current_job_path = await self.submit_start_job()
+        job = await self.track_job(
+            current_job_path, self.start_timeout, ("active",), started
+        )
+        self.start_result = job.result
+        if job.success:
+            await self.wait_for_state(("active",))
+        return job
+
+    async def stop(self) -> JobResult:
+        started = time.monotonic()
         current_job_path = await self.systemd_manager_proxy.stop_unit(
             self.unit_name, "replace"
         )
-        return await self.track_job(current_job_path=current_job_path)
+        job = await self.track_job(
+            current_job_path, self.stop_timeout, ("inactive", "failed"), started
+        )
+        if job.success:
+            await self.wait_for_state(("inactive", "failed"))
+        return job
+
+    async def wait_for_failure(self) -> None:
+        # a failed unit isn't removed, only count failures after it was active
+        await self.properties.wait_for_state(("active",), None)
+        await self.properties.wait_for_state(("failed",), None)
+
+    async def read_result(self) -> str:
+        """return the Result property of the service, e.g. exit-code or signal"""
+        try:
+            return await OrgFreedesktopSystemd1ServiceInterface.new_proxy(
+                SYSTEMD_DBUS_INTERFACE, self.unit_object_path, bus=self.systemd_dbus
+            ).result
+        except Exception as e:
+            self.log.debug(f"could not read the result of {self.unit_name}: {e}")
+            return "failed"
 
     async def on_unit_removed(self):
-        async for unit_name, unit_path in self.systemd_manager_proxy.unit_removed:
-            if self.unit_object_path == unit_path:
-                self.log.debug(f"{unit_path} ({unit_name}) removed, done")
-                self.unit_stop_tracker = None
-                await (
-                    self.frontend.stopped()
-                )  # this signals the controller that the unit was stopped
-                return
+        removed = asyncio.create_task(
+            self.dispatcher.wait_unit_removed(self.unit_object_path)
+        )
+        failed = asyncio.create_task(self.wait_for_failure())
+        try:
+            await asyncio.wait((removed, failed), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            removed.cancel()
+            failed.cancel()
+        # units which are collected after a failure are removed right afterwards
+        if failed.done() and not failed.cancelled():
+            self.exit_result = await self.read_result()
+            self.log.debug(f"{self.unit_name} failed: {self.exit_result}")
+        else:
+            self.exit_result = "success"
+            self.log.debug(
+                f"{self.unit_object_path} ({removed.result()}) removed, done"
+            )
+        self.unit_stop_tracker = None
+        # this signals the controller that the unit was stopped
+        await self.frontend.stopped()
 
     async def check_state(self, active_state: str, sub_state: str) -> bool:
         self.log.debug(f"{active_state=}, {sub_state=}")
@@ -118,26 +259,54 @@ class SystemdUnit:
 
         elif active_state in ("inactive", "dead", "failed") and sub_state in (
             "inactive",
-            "dead, failed",
+            "dead",
+            "failed",
         ):
             self._is_running = False
         return self._is_running
 
     async def is_running(self) -> bool:
-        active_state = await self.unit_proxy.active_state
-        sub_state = await self.unit_proxy.active_state
-        return await self.check_state(active_state, sub_state)
+        return await self.check_state(
+            self.properties.active_state, self.properties.sub_state
+        )
 
     async def get_status(self):
         return (
-            True
-            if (
-                await self.unit_proxy.active_state == "active"
-                and await self.unit_proxy.active_state == "running"
-            )
-            else False
+            self.properties.active_state == "active"
+            and self.properties.sub_state == "running"
         )
 
+    def is_frozen(self) -> bool:
+        return self.properties.get("freezer_state") in ("frozen", "freezing")
+
+    def invocation_id(self) -> bytes:
+        """return the id of the current run of the unit, it changes on every start"""
+        return bytes(self.properties.get("invocation_id", b""))
+
+    async def _set_freezer_state(self, frozen: bool) -> bool:
+        target = "frozen" if frozen else "running"
+        try:
+            if frozen:
+                await self.systemd_manager_proxy.freeze_unit(self.unit_name)
+            else:
+                await self.systemd_manager_proxy.thaw_unit(self.unit_name)
+        except Exception as e:
+            self.log.error(f"could not set the freezer state to {target}: {e}")
+            return False
+        if not await self.properties.wait_for(
+            lambda properties: properties.get("freezer_state") == target,
+            UNIT_STATE_TIMEOUT,
+        ):
+            await self.properties.refresh()
+        return self.properties.get("freezer_state") == target
+
+    async def freeze(self) -> bool:
+        """freeze the processes of the unit, it stays active"""
+        return await self._set_freezer_state(True)
+
+    async def thaw(self) -> bool:
+        return await self._set_freezer_state(False)
+
 
 class SystemdUnitProtocol(Protocol):
     name: str
@@ -152,6 +321,8 @@ class SystemdUnitFrontend(
     HasController,
     SystemdUnitProtocol,
 ):
+    unit_class: type[SystemdUnit] = SystemdUnit
+
     def __init__(
         self,
         config: UnitFrontendConfig,
@@ -171,6 +342,11 @@ class SystemdUnitFrontend(
         self.controller = controller
         self.use_pwsuspend = config.use_pwsuspend
         self.log.debug("use_pwsuspend is %s", self.use_pwsuspend)
+        self.suspend_mode = config.suspend_mode
+        self.start_timeout = config.start_timeout
+        self.stop_timeout = config.stop_timeout
+        # time.monotonic() of the freeze, None if the unit isn't frozen
+        self.frozen_since: float | None = None
 
         self.systemd_bus = get_bus(config.bus)
         self.systemd_manager_proxy = create_systemd_manager_proxy(
@@ -185,9 +361,15 @@ class SystemdUnitFrontend(
 
     async def __async_init__(self) -> Self:
         # await self.systemd_manager_proxy.subscribe()
-        self.unit = await SystemdUnit(
-            unit_name=self.unit_name, systemd_dbus=self.systemd_bus, frontend=self
+        self.unit = await self.unit_class(
+            unit_name=self.unit_name,
+            systemd_dbus=self.systemd_bus,
+            frontend=self,
+            start_timeout=self.start_timeout,
+            stop_timeout=self.stop_timeout,
         )
+        if self.unit.is_frozen():  # e.g. after a restart of yavdr-frontend
+            self.frozen_since = time.monotonic()
         return self
 
     def __await__(self) -> Generator[Any, None, Self]:
@@ -195,24 +377,61 @@ class SystemdUnitFrontend(
             self.__async_init__().__await__()
         )  # see https://stackoverflow.com/a/58976768
 
+    def close(self) -> None:
+        """release the signal subscriptions of the unit"""
+        self.unit.close()
+
     async def frontend_is_running(self) -> bool:
-        return await self.unit.is_running()
+        # a frozen unit is still active, but it doesn't use the display
+        return not self.unit.is_frozen() and await self.unit.is_running()
 
     async def start(self):
         if self.use_pwsuspend:
             pwsuspend()
 
         self.is_active = True
+        if self.frozen_since is not None:
+            self.log.debug(f"thawing {self.unit_name}")
+            self.frozen_since = None
+            if await self.unit.thaw() and await self.unit.is_running():
+                return
+            self.log.warning(f"could not thaw {self.unit_name}, starting it")
         self.log.debug(f"starting {self.unit_name}")
-        _success = await self.unit.start()
+        job = await self.unit.start()
+        self.log.debug(f"start of {self.unit_name}: {job.result} ({job.duration:.2f}s)")
 
     async def started(self): ...
 
+    def may_freeze(self) -> bool:
+        # the frontends are stopped for a shutdown
+        return self.suspend_mode is SuspendModeEnum.FREEZE and getattr(
+            self.controller, "state", None
+        ) not in (FrontendState.PREPARE_SHUTDOWN, FrontendState.QUIT)
+
     async def stop(self):
         self.is_active = False
+        if self.may_freeze():
+            self.log.debug(f"freezing {self.unit_name}")
+            if await self.unit.freeze():
+                self.frozen_since = time.monotonic()
+                if self.use_pwsuspend:
+                    await pwresume()
+                # the unit keeps running, so there is no UnitRemoved signal -
+                # the controller continues the transition itself
+                return
+            self.log.warning(f"could not freeze {self.unit_name}, stopping it")
+        await self.evict()
+
+    async def evict(self):
+        """really stop the unit, a frozen unit is thawed first"""
+        was_frozen = self.frozen_since is not None
+        if was_frozen:
+            self.frozen_since = None
+            await self.unit.thaw()
         self.log.debug(f"stopping {self.unit_name}")
-        _success = await self.unit.stop()
-        if self.use_pwsuspend:
+        job = await self.unit.stop()
+        self.log.debug(f"stop of {self.unit_name}: {job.result} ({job.duration:.2f}s)")
+        if self.use_pwsuspend and not was_frozen:  # resumed when it was frozen
             await pwresume()
 
     async def stopped(self):
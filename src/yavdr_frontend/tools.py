@@ -1,7 +1,6 @@
 import asyncio
 import importlib
 import logging
-import os
 from pathlib import Path
 import re
 import subprocess
@@ -15,6 +14,7 @@ gi.require_version("Gio", "2.0")
 from gi.repository import Gio  # pyright: ignore[reportMissingModuleSource] # noqa: E402
 
 from yavdr_frontend.config import DBusEnum, VDRConfig  # noqa: E402
+from yavdr_frontend.desktop_entries import desktop_entries  # noqa: E402
 from yavdr_frontend.protocols.frontend_protocols import SystemFrontendProtocol  # noqa: E402
 
 
@@ -119,19 +119,57 @@ async def pwresume() -> bool:
     return False
 
 
-def feh_set_background(
+def get_available_memory() -> int | None:
+    """return MemAvailable from /proc/meminfo in MiB"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError) as e:
+        logging.debug(f"could not read the available memory: {e}")
+    return None
+
+
+def get_memory_pressure() -> float | None:
+    """return the "some avg10" value of the memory pressure (PSI) in percent"""
+    try:
+        with open("/proc/pressure/memory") as f:
+            for line in f:
+                kind, *values = line.split()
+                if kind == "some":
+                    return float(dict(v.split("=") for v in values)["avg10"])
+    except (OSError, ValueError, KeyError) as e:
+        logging.debug(f"could not read the memory pressure: {e}")
+    return None
+
+
+async def feh_set_background(
     path: str | Path,
     fill: bool = False,
     env: dict[str, str] | Mapping[str, str] | None = None,
-) -> None:
-    """fill the background with the given image"""
+    timeout: float | None = None,
+) -> bool:
+    """fill the background with the given image, returns True on success"""
     bg_fill = "--bg-fill" if fill else "--bg-center"
     try:
-        subprocess.run(["feh", bg_fill, str(path)], check=True, env=env)
-    except subprocess.CalledProcessError as e:
-        logging.exception(f"could not set background to {path}: {e}")
+        process = await asyncio.create_subprocess_exec(
+            "feh", bg_fill, str(path), env=env
+        )
     except Exception as e:
         logging.exception(f"unexpected error when setting background to {path}: {e}")
+        return False
+    try:
+        async with asyncio.timeout(timeout):
+            returncode = await process.wait()
+    except TimeoutError:
+        logging.error(f"feh did not set the background to {path} within {timeout} s")
+        process.kill()
+        await process.wait()
+        return False
+    if returncode:
+        logging.error(f"could not set background to {path}: feh returned {returncode}")
+    return returncode == 0
 
 
 _MAP = {
@@ -233,16 +271,6 @@ class DelayedRepeatableTask:
         return self._task and not self._task.done()
 
 
-_xdg_dirs: list[Path] = []
-if _xdg_data_home := os.getenv("XDG_DATA_HOME"):
-    _xdg_dirs.append(Path(_xdg_data_home) / "applications")
-else:
-    _xdg_dirs.append(Path.home() / ".local/share/applications")
-_xdg_dirs.extend(
-    Path(p) / "applications" for p in os.getenv("XDG_DATA_DIRS", "").split(":") if p
-)
-
-
 async def run(cmd: str, args: list[str]) -> tuple[int | None, bytes, bytes]:
     proc = await asyncio.create_subprocess_exec(
         cmd, *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
@@ -265,35 +293,15 @@ def get_DesktopAppInfo(desktop_entry: str) -> Gio.DesktopAppInfo:
     # - we get the id
     # - we get the filename - here the first match wins
     # if there is no match, a ValueError is raised
-
-    try:
-        if (p := Path(desktop_entry)).is_absolute() and p.name.endswith(".desktop"):
-            if app := Gio.DesktopAppInfo.new_from_filename(filename=desktop_entry):
-                return app
-            else:
-                logging.warning(f"could not find app info for {desktop_entry}")
-
-        raise TypeError("invalid .desktop file path")
-    except (TypeError, ValueError):
-        try:
-            if app := Gio.DesktopAppInfo.new(desktop_id=desktop_entry):
-                return app
-            else:
-                raise TypeError("invalid desktop_id")
-        except TypeError:
-            print("looking for file in XDG_DIRS")
-            desktop_file = (
-                f"{desktop_entry}.desktop"
-                if not desktop_entry.endswith(".desktop")
-                else desktop_entry
-            )
-            for path in _xdg_dirs:
-                for f in path.rglob(desktop_file):
-                    if f.is_file():
-                        print(f"{f=}")
-                        try:
-                            return Gio.DesktopAppInfo(filename=f"{f}")
-                        except TypeError:
-                            continue
-
-        raise ValueError("no matching .desktop file")
+    if (p := Path(desktop_entry)).is_absolute() and p.name.endswith(".desktop"):
+        if app := Gio.DesktopAppInfo.new_from_filename(filename=desktop_entry):
+            return app
+        logging.warning(f"could not find app info for {desktop_entry}")
+        raise ValueError("invalid .desktop file path")
+
+    if path := desktop_entries.lookup(desktop_entry):
+        # NOTE: GIO returns None for hidden entries, so a hidden file in the user
+        #       directory masks the system one like it does for Gio.DesktopAppInfo.new()
+        if app := Gio.DesktopAppInfo.new_from_filename(filename=f"{path}"):
+            return app
+    raise ValueError("no matching .desktop file")
@@ -0,0 +1,129 @@
+import re
+import shlex
+import shutil
+from pathlib import Path
+from typing import Any
+
+import gi
+
+gi.require_version("Gio", "2.0")
+from gi.repository import Gio  # pyright: ignore[reportMissingModuleSource] # noqa: E402
+
+from yavdr_frontend.desktop_entries import desktop_entries  # noqa: E402
+from yavdr_frontend.systemdfrontend import (  # noqa: E402
+    SystemdUnit,
+    SystemdUnitFrontend,
+)
+from yavdr_frontend.tools import get_DesktopAppInfo  # noqa: E402
+from yavdr_frontend.unit_names import UNIT_NAME_MAX, systemd_escape  # noqa: E402
+
+# field codes for files and URIs, the frontends are started without any
+_FILE_FIELD_CODES = ("%f", "%F", "%u", "%U")
+_FIELD_CODE_RE = re.compile(r"%(.)")
+
+UnitProperties = list[tuple[str, tuple[str, Any]]]
+
+
+def transient_unit_name(app_name: str) -> str:
+    """return the name of the transient unit for a desktop id"""
+    unit_name = f"yavdr-app-{systemd_escape(app_name.removesuffix('.desktop'))}.service"
+    if len(unit_name) > UNIT_NAME_MAX:
+        raise ValueError(f"unit name is too long: {unit_name}")
+    return unit_name
+
+
+def exec_argv(app: Gio.DesktopAppInfo) -> list[str]:
+    """
+    return the command line of the Exec key of a .desktop file like it is started
+    by GIO without files or URIs
+    """
+    if not (commandline := app.get_commandline()):
+        raise ValueError(f"{app.get_id()} has no Exec key")
+
+    def expand(match: re.Match[str]) -> str:
+        match match.group(1):
+            case "%":
+                return "%"
+            case "c":
+                return app.get_name() or ""
+            case "k":
+                return app.get_filename() or ""
+            case _:  # deprecated field codes are removed
+                return ""
+
+    argv: list[str] = []
+    for arg in shlex.split(commandline):
+        if arg in _FILE_FIELD_CODES:
+            continue
+        if arg == "%i":
+            if icon := app.get_string("Icon"):
+                argv.extend(("--icon", icon))
+            continue
+        argv.append(_FIELD_CODE_RE.sub(expand, arg))
+    if not argv:
+        raise ValueError(f"{app.get_id()} has an empty Exec key")
+    # systemd needs an absolute path for the ExecStart of a transient unit
+    if (executable := shutil.which(argv[0])) is None:
+        raise ValueError(f"{argv[0]} of {app.get_id()} not found")
+    argv[0] = executable
+    return argv
+
+
+class TransientAppUnit(SystemdUnit):
+    """
+    Run the Exec line of a .desktop file as transient service instead of the
+    app@.service instance, which needs run-desktop to launch it.
+
+    The unit is created on every start and collected by systemd when it has
+    stopped or failed. The parsed .desktop file is kept until it changes.
+    """
+
+    frontend: "TransientAppFrontend"
+
+    _app_info: Gio.DesktopAppInfo | None = None
+    _app_info_key: tuple[Path, int] | None = None
+
+    def app_info(self) -> Gio.DesktopAppInfo:
+        app_name = self.frontend.app_name
+        if (path := desktop_entries.lookup(app_name)) is None:
+            raise ValueError(f"no matching .desktop file for {app_name}")
+        key = (path, path.stat().st_mtime_ns)
+        if self._app_info is None or key != self._app_info_key:
+            self._app_info = get_DesktopAppInfo(f"{path}")
+            self._app_info_key = key
+        return self._app_info
+
+    def transient_properties(self) -> UnitProperties:
+        app = self.app_info()
+        argv = exec_argv(app)
+        properties: UnitProperties = [
+            ("Description", ("s", app.get_name() or self.frontend.app_name)),
+            ("Type", ("s", "exec")),
+            ("ExecStart", ("a(sasb)", [(argv[0], argv, False)])),
+            ("CollectMode", ("s", "inactive-or-failed")),
+            # like app@.service
+            ("SuccessExitStatus", ("(aiai)", ([15], []))),
+            ("Conflicts", ("as", ["kodi.service"])),
+        ]
+        if working_directory := app.get_string("Path"):
+            properties.append(("WorkingDirectory", ("s", working_directory)))
+        return properties
+
+    async def submit_start_job(self) -> str:
+        properties = self.transient_properties()
+        try:
+            return await self.systemd_manager_proxy.start_transient_unit(
+                self.unit_name, "replace", properties, []
+            )
+        except Exception as e:
+            # UnitExists: the unit is still running or hasn't been collected yet
+            self.log.debug(f"could not create {self.unit_name}: {e}")
+            return await super().submit_start_job()
+
+
+class TransientAppFrontend(SystemdUnitFrontend):
+    unit_class = TransientAppUnit
+
+    def __init__(self, app_name: str, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.app_name = app_name
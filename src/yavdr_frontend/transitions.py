@@ -0,0 +1,350 @@
+import asyncio
+import enum
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import NamedTuple
+
+from yavdr_frontend.basicfrontend import FrontendState
+
+
+class TransitionEvent(enum.StrEnum):
+    START = "start"
+    STOP = "stop"
+    TOGGLE = "toggle"
+    SWITCH = "switch"
+    SWITCHTO = "switchto"
+    STOPPED = "stopped"  # the current frontend has stopped by itself
+    SWITCH_DISPLAYS = "switch-displays"
+    PREPARE_SHUTDOWN = "prepare-shutdown"
+    EVICT = "evict"  # stop frozen frontends to free memory
+    QUIT = "quit"
+
+
+class TransitionOutcome(enum.StrEnum):
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"  # a pending toggle was revoked by a second toggle
+    SUPERSEDED = "superseded"  # a pending request was replaced by a newer one
+    IGNORED = "ignored"  # the event has no effect in the projected state
+
+
+_S = FrontendState
+_E = TransitionEvent
+
+# the state a transition leaves behind for each state it begins in, None if the
+# event is ignored in that state. A stop for a shutdown or quit ends in STOP if
+# a frontend was running.
+TRANSITIONS: dict[FrontendState, dict[TransitionEvent, FrontendState | None]] = {
+    _S.SWITCH: {
+        _E.START: _S.SWITCH,
+        _E.STOP: _S.STOP,
+        _E.TOGGLE: _S.STOP,
+        _E.SWITCH: _S.SWITCH,
+        _E.SWITCHTO: _S.SWITCH,
+        _E.STOPPED: _S.SWITCH,
+        _E.SWITCH_DISPLAYS: _S.SWITCH,
+        _E.PREPARE_SHUTDOWN: _S.STOP,
+        _E.EVICT: _S.SWITCH,
+        _E.QUIT: _S.STOP,
+    },
+    _S.RESTART: {
+        _E.START: _S.SWITCH,
+        _E.STOP: _S.STOP,
+        _E.TOGGLE: _S.STOP,
+        _E.SWITCH: _S.SWITCH,
+        _E.SWITCHTO: _S.SWITCH,
+        _E.STOPPED: _S.SWITCH,
+        _E.SWITCH_DISPLAYS: _S.SWITCH,
+        _E.PREPARE_SHUTDOWN: _S.STOP,
+        _E.EVICT: _S.RESTART,
+        _E.QUIT: _S.STOP,
+    },
+    _S.STOP: {
+        _E.START: _S.SWITCH,
+        _E.STOP: _S.STOP,
+        _E.TOGGLE: _S.SWITCH,
+        _E.SWITCH: _S.SWITCH,
+        _E.SWITCHTO: _S.SWITCH,
+        _E.STOPPED: None,  # the frontend has been stopped on purpose
+        _E.SWITCH_DISPLAYS: _S.SWITCH,
+        _E.PREPARE_SHUTDOWN: _S.STOP,
+        _E.EVICT: _S.STOP,
+        _E.QUIT: _S.QUIT,
+    },
+    _S.PREPARE_SHUTDOWN: {
+        _E.START: _S.SWITCH,
+        _E.STOP: _S.STOP,
+        _E.TOGGLE: _S.SWITCH,
+        _E.SWITCH: _S.SWITCH,
+        _E.SWITCHTO: _S.SWITCH,
+        _E.STOPPED: _S.STOP,
+        _E.SWITCH_DISPLAYS: _S.SWITCH,
+        _E.PREPARE_SHUTDOWN: _S.STOP,
+        _E.EVICT: _S.PREPARE_SHUTDOWN,
+        _E.QUIT: _S.QUIT,
+    },
+    _S.QUIT: {
+        _E.START: _S.SWITCH,
+        _E.STOP: _S.STOP,
+        _E.TOGGLE: _S.SWITCH,
+        _E.SWITCH: _S.SWITCH,
+        _E.SWITCHTO: _S.SWITCH,
+        _E.STOPPED: _S.STOP,
+        _E.SWITCH_DISPLAYS: _S.SWITCH,
+        _E.PREPARE_SHUTDOWN: _S.STOP,
+        _E.EVICT: _S.QUIT,
+        _E.QUIT: _S.QUIT,
+    },
+}
+
+
+# a request with the same event and argument as a pending transition is answered
+# with the result of that transition
+COALESCING_EVENTS = frozenset(
+    {TransitionEvent.START, TransitionEvent.STOP, TransitionEvent.SWITCHTO}
+)
+# these events are coalesced with the running transition, too. A start or stop
+# is not, because the state might have changed while it was running (e.g. vdr
+# becoming ready during a start)
+COALESCING_RUNNING_EVENTS = frozenset({TransitionEvent.SWITCHTO})
+
+# a pending transition is dropped if a request for one of these events arrives
+SUPERSEDED_BY: dict[TransitionEvent, frozenset[TransitionEvent]] = {
+    TransitionEvent.START: frozenset({TransitionEvent.STOP}),
+    TransitionEvent.STOP: frozenset({TransitionEvent.START}),
+    TransitionEvent.SWITCHTO: frozenset({TransitionEvent.SWITCHTO}),
+}
+
+
+class TransitionResult(NamedTuple):
+    event: TransitionEvent
+    argument: str
+    outcome: TransitionOutcome
+    success: bool
+    message: str
+    duration: float  # seconds from the start of the transition until it finished
+    state: FrontendState  # the controller state after the transition
+
+
+TransitionCallback = Callable[[], Awaitable[tuple[bool, str]]]
+
+
+class Transition:
+    __slots__ = ("event", "argument", "run", "future", "state")
+
+    def __init__(
+        self,
+        event: TransitionEvent,
+        argument: str,
+        run: TransitionCallback,
+        future: asyncio.Future[TransitionResult],
+    ):
+        self.event = event
+        self.argument = argument
+        self.run = run
+        self.future = future
+        # the controller state when the transition began
+        self.state: FrontendState | None = None
+
+    def matches(self, event: TransitionEvent, argument: str) -> bool:
+        return self.event is event and self.argument == argument
+
+
+class TransitionEngine:
+    """
+    Run the frontend transitions of the controller one at a time.
+
+    Requests which arrive while a transition is running are decided against the
+    state the running and pending transitions leave behind (see TRANSITIONS) and
+    queued and coalesced: repeated requests for the same start, stop or switchto
+    target share one transition, a newer start/stop or switchto replaces a pending
+    one, a toggle during a running toggle shares its result and a second toggle
+    revokes a pending toggle. Requests made from within the running
+    transition (e.g. a frontend calling on_stopped during its stop()) are executed
+    directly to avoid waiting for themselves.
+    """
+
+    def __init__(
+        self,
+        get_state: Callable[[], FrontendState],
+        log: logging.Logger,
+        history_size: int = 32,
+    ):
+        self.get_state = get_state
+        self.log = log
+        self.current: Transition | None = None
+        self.pending: deque[Transition] = deque()
+        self.history: deque[TransitionResult] = deque(maxlen=history_size)
+        # called with the result of every finished transition
+        self.listeners: list[Callable[[TransitionResult], None]] = []
+        self._worker: asyncio.Task[None] | None = None
+
+    def projected_state(self) -> FrontendState:
+        """return the state after the running and the pending transitions"""
+        if (current := self.current) is not None and current.state is not None:
+            state = TRANSITIONS[current.state][current.event] or current.state
+        else:
+            state = self.get_state()
+        for transition in self.pending:
+            state = TRANSITIONS[state][transition.event] or state
+        return state
+
+    def in_transition(self) -> bool:
+        return self._worker is not None and asyncio.current_task() is self._worker
+
+    async def submit(
+        self, event: TransitionEvent, run: TransitionCallback, argument: str = ""
+    ) -> TransitionResult:
+        if self.in_transition():
+            self.log.debug("running nested transition %s(%s)", event, argument)
+            return await self._execute(event, argument, run)
+
+        future = self._enqueue(event, argument, run)
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        # the transition continues even if the caller is cancelled
+        return await asyncio.shield(future)
+
+    def _enqueue(
+        self, event: TransitionEvent, argument: str, run: TransitionCallback
+    ) -> asyncio.Future[TransitionResult]:
+        if (
+            event is TransitionEvent.TOGGLE
+            and not self.pending
+            and (current := self.current) is not None
+            and current.event is TransitionEvent.TOGGLE
+        ):
+            # a second toggle would undo the running one right after it finished
+            self.log.debug("coalescing %s(%s) with the running toggle", event, argument)
+            return current.future
+
+        future = asyncio.get_running_loop().create_future()
+        if TRANSITIONS[state := self.projected_state()][event] is None:
+            self._resolve(
+                Transition(event, argument, run, future),
+                TransitionOutcome.IGNORED,
+                True,
+                f"nothing to do in state {state.name}",
+            )
+            return future
+
+        if event in COALESCING_EVENTS:
+            candidates = (
+                (self.current, *self.pending)
+                if event in COALESCING_RUNNING_EVENTS
+                else self.pending
+            )
+            for transition in candidates:
+                if transition is not None and transition.matches(event, argument):
+                    self.log.debug("coalescing %s(%s)", event, argument)
+                    return transition.future
+
+        if event is TransitionEvent.TOGGLE and self.pending:
+            if (last := self.pending[-1]).event is TransitionEvent.TOGGLE:
+                self.pending.pop()
+                result = self._resolve(
+                    last, TransitionOutcome.CANCELLED, True, "revoked by a second toggle"
+                )
+                future.set_result(result._replace(message="revoked a pending toggle"))
+                return future
+
+        superseding = SUPERSEDED_BY.get
+        for transition in list(self.pending):
+            if event in superseding(transition.event, ()):
+                self.pending.remove(transition)
+                self._resolve(
+                    transition,
+                    TransitionOutcome.SUPERSEDED,
+                    False,
+                    f"superseded by {event}({argument})",
+                )
+
+        self.pending.append(Transition(event, argument, run, future))
+        return future
+
+    def _resolve(
+        self,
+        transition: Transition,
+        outcome: TransitionOutcome,
+        success: bool,
+        message: str,
+        duration: float = 0.0,
+    ) -> TransitionResult:
+        result = TransitionResult(
+            transition.event,
+            transition.argument,
+            outcome,
+            success,
+            message,
+            duration,
+            self.get_state(),
+        )
+        self.history.append(result)
+        self.log.info(
+            "transition %s(%s) %s after %.3f s: %s",
+            result.event,
+            result.argument,
+            result.outcome,
+            result.duration,
+            result.message,
+        )
+        if not transition.future.done():
+            transition.future.set_result(result)
+        for callback in self.listeners:
+            try:
+                callback(result)
+            except Exception as e:
+                self.log.exception(e)
+        return result
+
+    async def _execute(
+        self, event: TransitionEvent, argument: str, run: TransitionCallback
+    ) -> TransitionResult:
+        start = time.perf_counter()
+        try:
+            success, message = await run()
+        except Exception as e:
+            self.log.exception(e)
+            success, message = False, repr(e)
+        return TransitionResult(
+            event,
+            argument,
+            TransitionOutcome.DONE if success else TransitionOutcome.FAILED,
+            success,
+            message,
+            time.perf_counter() - start,
+            self.get_state(),
+        )
+
+    async def _run(self) -> None:
+        try:
+            while self.pending:
+                transition = self.current = self.pending.popleft()
+                transition.state = self.get_state()
+                self.log.debug(
+                    "begin transition %s(%s) in state %s",
+                    transition.event,
+                    transition.argument,
+                    self.get_state(),
+                )
+                result = await self._execute(
+                    transition.event, transition.argument, transition.run
+                )
+                self.current = None
+                self._resolve(
+                    transition,
+                    result.outcome,
+                    result.success,
+                    result.message,
+                    result.duration,
+                )
+        finally:
+            self.current = None
+            self._worker = None
+            for transition in self.pending:  # only left if the worker was cancelled
+                self._resolve(
+                    transition, TransitionOutcome.CANCELLED, False, "engine stopped"
+                )
+            self.pending.clear()
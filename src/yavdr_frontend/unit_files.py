@@ -0,0 +1,143 @@
+import asyncio
+import bisect
+import fnmatch
+import os
+from collections.abc import Callable
+
+from yavdr_frontend.config import DBusEnum
+from yavdr_frontend.interfaces.systemd_dbus_interface import (
+    OrgFreedesktopSystemd1ManagerInterface,
+    create_systemd_manager_proxy,
+)
+from yavdr_frontend.loghandler import create_log_handler
+from yavdr_frontend.tools import get_bus
+
+_GLOB_CHARS = "*?["
+
+
+class UnitFileCatalogue:
+    """
+    Cache of the unit files known to a systemd manager.
+
+    The unit files are loaded on the first use and loaded again on the next use
+    after the manager signalled UnitFilesChanged or finished a reload. The names
+    are kept in a dict for membership tests and in a sorted list, so prefix and
+    glob lookups only look at the names starting with the literal prefix.
+    """
+
+    def __init__(self, systemd_manager: OrgFreedesktopSystemd1ManagerInterface):
+        self.log = create_log_handler("UnitFileCatalogue")
+        self.systemd_manager = systemd_manager
+        # unit name -> (path of the unit file, enablement state)
+        self.unit_files: dict[str, tuple[str, str]] = {}
+        self.sorted_names: list[str] = []
+        self.stale = True
+        self.listeners: list[Callable[[str], None]] = []
+        self._loading: asyncio.Task[None] | None = None
+        self._watchers: list[asyncio.Task[None]] = []
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        """call callback with the reason whenever the unit files might have changed"""
+        self.listeners.append(callback)
+
+    def watch(self) -> None:
+        """listen to the change signals, must be called from the event loop"""
+        if not self._watchers:
+            self._watchers = [
+                asyncio.create_task(self._watch_unit_files()),
+                asyncio.create_task(self._watch_reloading()),
+            ]
+
+    async def _load(self) -> None:
+        self.watch()  # subscribe before loading, so no change gets lost
+        self.stale = False
+        unit_files: dict[str, tuple[str, str]] = {}
+        for path, state in await self.systemd_manager.list_unit_files():
+            unit_files.setdefault(os.path.basename(path), (path, state))
+        self.unit_files = unit_files
+        self.sorted_names = sorted(unit_files)
+        self.log.debug(f"loaded {len(unit_files)} unit files")
+
+    async def refresh(self) -> None:
+        """load the unit files if they are stale, concurrent callers share the call"""
+        while self.stale:
+            if self._loading is None:
+                self._loading = asyncio.create_task(self._load())
+                self._loading.add_done_callback(self._loaded)
+            await asyncio.shield(self._loading)
+
+    def _loaded(self, task: asyncio.Task[None]) -> None:
+        self._loading = None
+        if task.cancelled() or task.exception() is not None:
+            self.stale = True
+
+    async def names(self) -> list[str]:
+        """return the sorted names of all unit files"""
+        await self.refresh()
+        return self.sorted_names
+
+    async def contains(self, unit_name: str) -> bool:
+        await self.refresh()
+        return unit_name in self.unit_files
+
+    async def get(self, unit_name: str) -> tuple[str, str] | None:
+        """return the path and the enablement state of a unit file"""
+        await self.refresh()
+        return self.unit_files.get(unit_name)
+
+    async def startswith(self, prefix: str) -> list[str]:
+        await self.refresh()
+        return self._startswith(prefix)
+
+    def _startswith(self, prefix: str) -> list[str]:
+        names = self.sorted_names
+        start = bisect.bisect_left(names, prefix)
+        end = start
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return names[start:end]
+
+    async def match(self, pattern: str) -> list[str]:
+        """return the unit names matching a shell-style pattern like systemctl does"""
+        await self.refresh()
+        prefix_end = min(
+            (i for c in _GLOB_CHARS if (i := pattern.find(c)) != -1),
+            default=len(pattern),
+        )
+        if prefix_end == len(pattern):
+            return [pattern] if pattern in self.unit_files else []
+        return [
+            name
+            for name in self._startswith(pattern[:prefix_end])
+            if fnmatch.fnmatchcase(name, pattern)
+        ]
+
+    def invalidate(self, reason: str) -> None:
+        self.log.debug(f"unit files are stale: {reason}")
+        self.stale = True
+        for callback in self.listeners:
+            try:
+                callback(reason)
+            except Exception as e:
+                self.log.exception(e)
+
+    async def _watch_unit_files(self) -> None:
+        async for _ in self.systemd_manager.unit_files_changed:
+            self.invalidate("unit files changed")
+
+    async def _watch_reloading(self) -> None:
+        async for active in self.systemd_manager.reloading:
+            if not active:
+                self.invalidate("systemd reloaded")
+
+
+_catalogues: dict[DBusEnum, UnitFileCatalogue] = {}
+
+
+def get_unit_file_catalogue(bus: DBusEnum) -> UnitFileCatalogue:
+    """return the shared unit file catalogue of the systemd manager on bus"""
+    if (catalogue := _catalogues.get(bus)) is None:
+        catalogue = _catalogues[bus] = UnitFileCatalogue(
+            create_systemd_manager_proxy(bus=get_bus(bus))
+        )
+    return catalogue
@@ -0,0 +1,38 @@
+import functools
+
+# characters which systemd doesn't escape in unit names, see unit_name_escape()
+_SYSTEMD_VALID_CHARS = frozenset(
+    b"0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ:_."
+)
+UNIT_NAME_MAX = 255
+
+
+@functools.lru_cache(maxsize=256)
+def systemd_escape(value: str) -> str:
+    """escape a string like `systemd-escape <value>`"""
+    escaped: list[str] = []
+    for i, c in enumerate(value.encode()):
+        if c == ord("/"):
+            escaped.append("-")
+        elif c in _SYSTEMD_VALID_CHARS and not (i == 0 and c == ord(".")):
+            escaped.append(chr(c))
+        else:
+            escaped.append(f"\\x{c:02x}")
+    return "".join(escaped)
+
+
+@functools.lru_cache(maxsize=256)
+def systemd_escape_template(template: str, value: str) -> str:
+    """
+    escape value as instance of a template unit like
+    `systemd-escape --template=<template> <value>`
+    """
+    prefix, at, suffix = template.partition("@")
+    if not at or not prefix or not suffix.startswith("."):
+        raise ValueError(f"invalid template unit name: {template}")
+    if not value:  # systemd-escape refuses to create an empty instance
+        raise ValueError("the instance name of a template unit must not be empty")
+    unit_name = f"{prefix}@{systemd_escape(value)}{suffix}"
+    if len(unit_name) > UNIT_NAME_MAX:
+        raise ValueError(f"unit name is too long: {unit_name}")
+    return unit_name
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from collections.abc import Callable, Collection, Generator, Mapping
+from types import MappingProxyType
+from typing import Any, Self
+
+from sdbus import SdBus
+from sdbus.sd_bus_internals import SdBusMessage, SdBusSlot
+from sdbus.utils import parse_properties_changed
+
+from yavdr_frontend.interfaces.systemd_dbus_interface import SYSTEMD_DBUS_INTERFACE
+from yavdr_frontend.interfaces.systemd_unit_interface import (
+    OrgFreedesktopSystemd1UnitInterface,
+)
+
+SYSTEMD_DBUS_UNIT_INTERFACE = "org.freedesktop.systemd1.Unit"
+# GetAll is repeated if the unit changed while it was loading
+REFRESH_ATTEMPTS = 3
+
+UnitPredicate = Callable[[Mapping[str, Any]], bool]
+
+
+class UnitPropertyCache:
+    """
+    Cache of the properties of a systemd unit.
+
+    The properties are loaded with a single GetAll call and updated from the
+    PropertiesChanged signals of the unit object, so state checks don't need a
+    round trip to systemd. wait_for() waits until the properties match a condition.
+    The signals are applied in the match callback as soon as they are received.
+    NOTE: systemd only emits the signals if a client called Subscribe() on the manager
+    """
+
+    def __init__(
+        self,
+        unit_proxy: OrgFreedesktopSystemd1UnitInterface,
+        log: logging.Logger,
+        bus: SdBus,
+        object_path: str,
+    ):
+        self.unit_proxy = unit_proxy
+        self.log = log
+        self.bus = bus
+        self.object_path = object_path
+        self.properties: dict[str, Any] = {}
+        self.waiters: list[tuple[UnitPredicate, asyncio.Future[bool]]] = []
+        self._match: SdBusSlot | None = None
+        # number of received PropertiesChanged signals
+        self._changes = 0
+
+    async def __async_init__(self) -> Self:
+        # the match must be active before loading the properties,
+        # so no change gets lost
+        self._match = await self.bus.match_signal_async(
+            SYSTEMD_DBUS_INTERFACE,
+            self.object_path,
+            "org.freedesktop.DBus.Properties",
+            "PropertiesChanged",
+            self.on_properties_changed,
+        )
+        await self.refresh()
+        return self
+
+    def __await__(self) -> Generator[Any, None, Self]:
+        return self.__async_init__().__await__()
+
+    def close(self) -> None:
+        """stop watching the signals of the unit, e.g. when the frontend is released"""
+        if self._match is not None:
+            self._match.close()
+            self._match = None
+        for _predicate, future in self.waiters:
+            future.cancel()
+        self.waiters.clear()
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.properties.get(name, default)
+
+    def snapshot(self) -> Mapping[str, Any]:
+        return MappingProxyType(self.properties)
+
+    @property
+    def active_state(self) -> str:
+        return self.properties.get("active_state", "")
+
+    @property
+    def sub_state(self) -> str:
+        return self.properties.get("sub_state", "")
+
+    async def refresh(self) -> None:
+        """reload all properties of the unit"""
+        for _ in range(REFRESH_ATTEMPTS):
+            changes = self._changes
+            properties = await self.unit_proxy.properties_get_all_dict(
+                on_unknown_member="ignore"
+            )
+            # signals received while waiting for the reply may be newer or older
+            # than it, without them the reply is the current state
+            if changes == self._changes:
+                break
+            self.log.debug("the unit changed while loading its properties, retry")
+        self.properties.update(properties)
+        self._notify()
+
+    async def wait_for(self, predicate: UnitPredicate, timeout: float | None) -> bool:
+        """
+        wait until predicate returns True for the properties,
+        returns False if this didn't happen within timeout seconds
+        """
+        if predicate(self.properties):
+            return True
+        future: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        waiter = (predicate, future)
+        self.waiters.append(waiter)
+        try:
+            async with asyncio.timeout(timeout):
+                return await future
+        except TimeoutError:
+            return False
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+    async def wait_for_state(
+        self, active_states: Collection[str], timeout: float | None
+    ) -> bool:
+        """wait until the ActiveState of the unit is one of active_states"""
+        return await self.wait_for(
+            lambda properties: properties.get("active_state") in active_states, timeout
+        )
+
+    def _notify(self) -> None:
+        for waiter in list(self.waiters):
+            predicate, future = waiter
+            if not future.done() and predicate(self.properties):
+                future.set_result(True)
+                self.waiters.remove(waiter)
+
+    def on_properties_changed(self, message: SdBusMessage) -> None:
+        data = message.get_contents()
+        if data[0] != SYSTEMD_DBUS_UNIT_INTERFACE:
+            return
+        self._changes += 1
+        changed = parse_properties_changed(
+            OrgFreedesktopSystemd1UnitInterface, data, on_unknown_member="ignore"
+        )
+        for name, value in changed.items():
+            if value is None:  # invalidated, it is read again on the next refresh
+                self.properties.pop(name, None)
+            else:
+                self.properties[name] = value
+        if "active_state" in changed or "sub_state" in changed:
+            self.log.debug(f"state: {self.active_state} ({self.sub_state})")
+        self._notify()
@@ -2,7 +2,6 @@ from abc import abstractmethod
 import asyncio
 import enum
 import logging
-import os
 import time
 from collections.abc import Awaitable, Callable, Generator
 from typing import Any, NamedTuple, Protocol, Self, cast, TYPE_CHECKING
@@ -37,6 +36,12 @@ from yavdr_frontend.interfaces.vdr_status import (
 )
 from yavdr_frontend.loghandler import create_log_handler
 from yavdr_frontend.tools import get_bus, get_vdr_service_name
+from yavdr_frontend.unit_files import get_unit_file_catalogue
+
+
+# how long a start waits for the VDR to become ready, a later ready signal of
+# dbus2vdr starts the frontend anyway
+VDR_READY_TIMEOUT = 10.0
 
 
 class StartType(enum.Enum):
@@ -57,7 +62,9 @@ class VDRDevice(NamedTuple):
 class DBus2VDR:
     def __init__(self, vdr_config: VDRConfig):
         self.vdr_bus = get_bus(vdr_config.dbus2vdr_bus)
-        vdr_service_name = get_vdr_service_name(vdr_config)
+        self.vdr_service_name = vdr_service_name = get_vdr_service_name(vdr_config)
+        # plugin name -> proxy for its SVDRP commands, dropped when the VDR restarts
+        self.plugin_proxies: dict[str, DeTvdrVdrPluginInterface] = {}
 
         self.vdr_device = DeTvdrVdrDeviceInterface.new_proxy(
             vdr_service_name, "/Devices", bus=self.vdr_bus
@@ -91,13 +98,35 @@ class DBus2VDR:
                 if not device.is_primary:
                     return await self.vdr_device.request_primary(device.idx)
 
+    def plugin_proxy(self, plugin_name: str) -> DeTvdrVdrPluginInterface:
+        if (proxy := self.plugin_proxies.get(plugin_name)) is None:
+            proxy = DeTvdrVdrPluginInterface.new_proxy(
+                self.vdr_service_name, f"/Plugins/{plugin_name}", bus=self.vdr_bus
+            )
+            self.plugin_proxies[plugin_name] = proxy
+        return proxy
+
+    def invalidate(self) -> None:
+        """drop the plugin proxies, e.g. when the owner of the VDR bus name changed"""
+        self.plugin_proxies.clear()
+
     async def svdrpcommand(
         self, plugin_name: str, cmd: str, option: str = ""
     ) -> tuple[int, str]:
-        plugin_interface = DeTvdrVdrPluginInterface.new_proxy(
-            "de.tvdr.vdr", f"/Plugins/{plugin_name}", bus=self.vdr_bus
+        return await self.plugin_proxy(plugin_name).svdrpcommand(cmd, option)
+
+    async def svdrpcommands(
+        self, plugin_name: str, *commands: tuple[str, str]
+    ) -> list[tuple[int, str]]:
+        """
+        send independent (cmd, option) SVDRP commands to a plugin without waiting
+        for the previous replies, the replies are returned in order. A command
+        which depends on the result of another one must be sent after its reply.
+        """
+        proxy = self.plugin_proxy(plugin_name)
+        return await asyncio.gather(
+            *(proxy.svdrpcommand(cmd, option) for cmd, option in commands)
         )
-        return await plugin_interface.svdrpcommand(cmd, option)
 
 
 class VDRController(FrontendProtocol):
@@ -149,7 +178,7 @@ class VDRController(FrontendProtocol):
             self.log.exception(e)
         else:
             self.status_change = self.dbus2vdr.vdr_status.properties_changed
-            if await self.vdr_status.is_running() and await self.vdr_is_ready():
+            if await self.vdr_is_ready():
                 # self.log.debug("loading frontend")
                 await self.load_frontend()
 
@@ -165,7 +194,7 @@ class VDRController(FrontendProtocol):
             # and self.controller.state == FrontendState.RESTART
         ):
             try:
-                if await self.vdr_is_ready():
+                if await self.wait_vdr_ready():
                     self.log.debug("vdr is ready")
                     await self.load_frontend()
                     if isinstance(self.controller.current_frontend, VDRController):
@@ -235,10 +264,7 @@ class VDRController(FrontendProtocol):
         this method returns the existing unit names.
         Don't remove or self.controller.get_frontend called with two arguments won't work!
         """
-        return [
-            os.path.basename(unit[0])
-            for unit in await self.systemd_manager_proxy.list_unit_files()
-        ]
+        return await get_unit_file_catalogue(self.config.vdr.dbus2vdr_bus).names()
 
     async def load_frontend(self):
         """
@@ -371,10 +397,10 @@ class VDRController(FrontendProtocol):
         """
 
         # this method is called by yaVDRFrontend regardless if VDR is ready, so
-        # we need a mechanism to abort early
+        # we wait for it and abort if it doesn't get ready in time
         # if not self.dbus2vdr.vdr_isready:
         try:
-            if not await self.vdr_is_ready():
+            if not await self.wait_vdr_ready():
                 self.log.warning("startup(): VDR is not ready")
                 return
         except sdbus.dbus_exceptions.DbusServiceUnknownError:
@@ -425,7 +451,7 @@ class VDRController(FrontendProtocol):
                             )
                             # NOTE: can we move this to the controller?
                             if self.controller.shutdown_queue.empty():
-                                await self.controller.delay(
+                                self.controller.schedule_delay(
                                     shutdown_delay,
                                     self.controller.poweroff(instant=True),
                                 )
@@ -434,7 +460,7 @@ class VDRController(FrontendProtocol):
                 # in case of StartType.VDR_WAKEUP try to shutdown the system every 5 Minutes
                 if self.controller.shutdown_queue.empty():
                     shutdown_delay = 5 * 60  # 5 Minutes
-                    await self.controller.delay(
+                    self.controller.schedule_delay(
                         shutdown_delay,
                         self.controller.poweroff(instant=True),
                     )
@@ -486,9 +512,12 @@ class VDRController(FrontendProtocol):
         return False
 
     async def vdr_is_ready(self) -> bool:
-        status = await self.dbus2vdr.vdr_vdrstatus.status()
-        self.log.debug(f"vdr status: {status}")
-        return status == "Ready"
+        # the state is kept up to date by the signals of dbus2vdr
+        return await self.vdr_status.is_running()
+
+    async def wait_vdr_ready(self, timeout: float = VDR_READY_TIMEOUT) -> bool:
+        """wait until the VDR is ready, returns False after timeout seconds"""
+        return await self.vdr_status.wait_for_state(VDR_STATE.READY, timeout)
 
     async def started(self) -> None:
         raise NotImplementedError("Unexpected call of method started")
@@ -502,6 +531,7 @@ class VDRController(FrontendProtocol):
 
 class VDRStatusProtocol(Protocol):
     vdr_stopping: bool
+    state: "VDR_STATE"
 
     @abstractmethod
     def __init__(
@@ -518,6 +548,11 @@ class VDRStatusProtocol(Protocol):
     @abstractmethod
     async def __async_init__(self) -> Self: ...
 
+    @abstractmethod
+    async def wait_for_state(
+        self, state: "VDR_STATE", timeout: float | None = None
+    ) -> bool: ...
+
     @abstractmethod
     async def is_running(self) -> bool:
         ...
@@ -547,6 +582,10 @@ class VDR_STATE(enum.StrEnum):
 class DBus2VDRStatusHandler(VDRStatusProtocol):
     # This class tracks the status of the VDR.
     #
+    # The state is set by the start, ready and stop signals of dbus2vdr and the
+    # NameOwnerChanged signals of its bus name. Status() is only called at the
+    # startup and when dbus2vdr appeared on the bus, so the state checks of the
+    # frontends don't need a round trip to the VDR.
     def __init__(
         self,
         on_start: Callable[[], Awaitable[None]],
@@ -560,13 +599,18 @@ class DBus2VDRStatusHandler(VDRStatusProtocol):
         self.config = config
         self.dbus2vdr = dbus2vdr
         self.bus = get_bus(config.dbus2vdr_bus)
-        self.vdr_name = f"de.tvdr.vdr{'' if self.config.id == 0 else self.config.id}"
+        self.vdr_name = get_vdr_service_name(config)
         self.log = create_log_handler(
             f"{self.__class__.__name__}<{self.vdr_name}>", loglevel
         )
         self.vdr_bus_owner: str = ""
 
         self.vdr_stopping = False
+        self.state = VDR_STATE.UNKNOWN
+        # the event of the current state is set
+        self.state_events = {state: asyncio.Event() for state in VDR_STATE}
+        self.state_events[self.state].set()
+        self.reconcile_task: asyncio.Task[None] | None = None
 
         self.vdr_status = DeTvdrVdrVdrInterface.new_proxy(
             get_vdr_service_name(config),
@@ -578,19 +622,69 @@ class DBus2VDRStatusHandler(VDRStatusProtocol):
 
     async def __async_init__(self) -> Self:
         self.dbus_watcher = asyncio.create_task(self.track_name_owner_changed())
+        self.dbus2vdr_watch_start = asyncio.create_task(
+            self.track_dbus2vdr_start_signal()
+        )
         self.dbus2vdr_watch_ready = asyncio.create_task(
             self.track_dbus2vdr_ready_signal()
         )
         self.dbus2vdr_watcher = asyncio.create_task(self.track_dbus2vdr_stop_signal())
+        try:  # needed to notice when a VDR which is already running stops
+            self.vdr_bus_owner = await self.dbus_signals.get_name_owner(self.vdr_name)
+        except Exception as e:
+            self.log.debug(f"{self.vdr_name} has no owner: {e}")
+        await self.reconcile()
         return self
 
     async def is_running(self) -> bool:
+        return self.state is VDR_STATE.READY
+
+    def set_state(self, state: VDR_STATE) -> None:
+        if state is self.state:
+            return
+        self.log.debug(f"vdr state: {self.state} -> {state}")
+        self.state_events[self.state].clear()
+        self.state = state
+        self.state_events[state].set()
+
+    async def wait_for_state(
+        self, state: VDR_STATE, timeout: float | None = None
+    ) -> bool:
+        """wait until the VDR has the state, returns False after timeout seconds"""
         try:
-            current_state = await self.vdr_status.status()
-            self.log.debug(f"self.vdr_status.status()={current_state}")
-            return (await self.vdr_status.status()) == VDR_STATE.READY
-        except sdbus.dbus_exceptions.DbusServiceUnknownError:
+            async with asyncio.timeout(timeout):
+                await self.state_events[state].wait()
+        except TimeoutError:
             return False
+        return True
+
+    async def reconcile(self) -> None:
+        """read the state from dbus2vdr, e.g. if signals might have been missed"""
+        try:
+            status = await self.vdr_status.status()
+        except sdbus.dbus_exceptions.DbusServiceUnknownError:
+            self.set_state(VDR_STATE.STOP)
+            return
+        except Exception as e:
+            self.log.warning(f"could not get the status of the vdr: {e}")
+            self.set_state(VDR_STATE.UNKNOWN)
+            return
+        self.log.debug(f"self.vdr_status.status()={status}")
+        try:
+            self.set_state(VDR_STATE(status))
+        except ValueError:
+            self.set_state(VDR_STATE.UNKNOWN)
+
+    def schedule_reconcile(self) -> None:
+        if self.reconcile_task is not None:
+            self.reconcile_task.cancel()
+        self.reconcile_task = asyncio.create_task(self.reconcile())
+
+    async def track_dbus2vdr_start_signal(self):
+        async for instance_id in self.dbus2vdr.vdr_vdrstatus.start:
+            if instance_id == self.config.id:
+                self.log.debug(f"got start from vdr with {instance_id=}")
+                self.set_state(VDR_STATE.START)
 
     async def track_dbus2vdr_ready_signal(self):
         async for instance_id in self.dbus2vdr.vdr_vdrstatus.ready:
@@ -601,6 +695,7 @@ class DBus2VDRStatusHandler(VDRStatusProtocol):
             if instance_id == self.config.id:
                 self.log.info(f"TODO: react to ready of vdr with {instance_id=}")
                 self.vdr_stopping = False
+                self.set_state(VDR_STATE.READY)
                 await self.on_start()
 
     async def track_dbus2vdr_stop_signal(self):
@@ -612,6 +707,7 @@ class DBus2VDRStatusHandler(VDRStatusProtocol):
             if instance_id == self.config.id:
                 print(f"TODO: react to stop of vdr with {instance_id=}")
                 self.vdr_stopping = True
+                self.set_state(VDR_STATE.STOP)
 
     async def track_name_owner_changed(self):
         #  track NameOwnerChanged signals
@@ -620,9 +716,17 @@ class DBus2VDRStatusHandler(VDRStatusProtocol):
             # print(f"got NameOwnerChanged signal: {signal}")
             if signal.name == self.vdr_name and len(signal.old_owner) == 0:
                 self.vdr_bus_owner = signal.new_owner
+                self.dbus2vdr.invalidate()
                 self.log.info("dbus2vdr appeared on the bus")
+                # the ready signal might have been sent before we subscribed
+                self.schedule_reconcile()
                 # await self.on_start()
             elif len(signal.new_owner) == 0 and signal.old_owner == self.vdr_bus_owner:
                 self.vdr_bus_owner = ""
+                self.dbus2vdr.invalidate()
                 self.log.info("dbus2vdr disappeared from the bus")
                 self.vdr_stopping = True
+                if self.reconcile_task is not None:
+                    self.reconcile_task.cancel()
+                # the VDR has stopped or crashed
+                self.set_state(VDR_STATE.STOP)
@@ -0,0 +1,127 @@
+import shutil
+import subprocess
+
+import pytest
+
+from yavdr_frontend.unit_names import (
+    UNIT_NAME_MAX,
+    systemd_escape,
+    systemd_escape_template,
+)
+
+SYSTEMD_ESCAPE = shutil.which("systemd-escape")
+
+NAMES = [
+    "kodi.desktop",
+    "firefox_firefox.desktop",
+    "org.kde.dolphin.desktop",
+    "debian-xterm.desktop",
+    "foo bar.desktop",
+    "-leading-dash",
+    ".hidden.desktop",
+    "a.b..c",
+    "with/slash/inside",
+    "/absolute/path",
+    "trailing/",
+    "ümläut.desktop",
+    "日本語.desktop",
+    "emoji-🎬.desktop",
+    "tab\there",
+    "quote'double\"",
+    "back\\slash",
+    "percent%i@at",
+    "colon:underscore_",
+    "x" * 100,
+    # non-ASCII and control characters
+    "ß",
+    "Ωmega.desktop",
+    "café/crème",
+    "\u00a0nbsp",
+    "zero\u200bwidth",
+    "\x7f",
+    "\x01ctrl",
+    # leading dots
+    ".",
+    "..",
+    ".a",
+    "./relative",
+    "..double",
+    ". space",
+    # slashes
+    "/",
+    "//",
+    "///a//b///",
+    "a/",
+    "/a/",
+    "a/./b",
+    "a/../b",
+    "/-/",
+    # dashes
+    "-",
+    "--",
+    "-a-",
+    "a-b-c",
+    "a--b",
+    "a/-b",
+    "-/",
+]
+
+# recorded output of systemd-escape, these are checked without the binary
+ESCAPED = {
+    "ümläut.desktop": "\\xc3\\xbcml\\xc3\\xa4ut.desktop",
+    ".hidden.desktop": "\\x2ehidden.desktop",
+    "///a//b///": "---a--b---",
+    "-a-": "\\x2da\\x2d",
+    "a/-b": "a-\\x2db",
+    "foo bar.desktop": "foo\\x20bar.desktop",
+}
+
+requires_systemd_escape = pytest.mark.skipif(
+    SYSTEMD_ESCAPE is None, reason="systemd-escape is not installed"
+)
+
+
+def run_systemd_escape(*args: str) -> subprocess.CompletedProcess[bytes]:
+    assert SYSTEMD_ESCAPE is not None
+    return subprocess.run([SYSTEMD_ESCAPE, *args], capture_output=True)
+
+
+@pytest.mark.parametrize("name, escaped", ESCAPED.items())
+def test_systemd_escape(name: str, escaped: str):
+    assert systemd_escape(name) == escaped
+
+
+@requires_systemd_escape
+@pytest.mark.parametrize("name", NAMES)
+def test_systemd_escape_matches_binary(name: str):
+    result = run_systemd_escape("--", name)
+    assert result.returncode == 0
+    assert systemd_escape(name) == result.stdout.decode().rstrip("\n")
+
+
+@requires_systemd_escape
+@pytest.mark.parametrize("name", NAMES)
+def test_systemd_escape_template_matches_binary(name: str):
+    result = run_systemd_escape("--template=app@.service", "--", name)
+    assert result.returncode == 0
+    assert systemd_escape_template("app@.service", name) == (
+        result.stdout.decode().rstrip("\n")
+    )
+
+
+@requires_systemd_escape
+def test_systemd_escape_template_rejects_empty_instance():
+    assert run_systemd_escape("--template=app@.service", "").returncode != 0
+    with pytest.raises(ValueError):
+        systemd_escape_template("app@.service", "")
+
+
+@pytest.mark.parametrize("template", ["app.service", "@.service", "app@service"])
+def test_systemd_escape_template_rejects_invalid_templates(template: str):
+    with pytest.raises(ValueError):
+        systemd_escape_template(template, "kodi.desktop")
+
+
+def test_systemd_escape_template_rejects_long_names():
+    with pytest.raises(ValueError):
+        systemd_escape_template("app@.service", "x" * UNIT_NAME_MAX)